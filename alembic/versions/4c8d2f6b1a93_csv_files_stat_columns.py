@@ -0,0 +1,30 @@
+"""store csv_files mtime/size so unchanged files skip re-hashing
+
+Revision ID: 4c8d2f6b1a93
+Revises: e3a7d1c95f20
+Create Date: 2025-10-06 09:41:27.530914
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4c8d2f6b1a93'
+down_revision: Union[str, Sequence[str], None] = 'e3a7d1c95f20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("csv_files", sa.Column("mtime_ns", sa.BigInteger(), nullable=True))
+    op.add_column("csv_files", sa.Column("size", sa.BigInteger(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("csv_files", "size")
+    op.drop_column("csv_files", "mtime_ns")
@@ -0,0 +1,51 @@
+"""csv_rows.fields as jsonb with gin index
+
+Revision ID: 7c2e9a41d5b3
+Revises: 045eb2cf421a
+Create Date: 2025-10-02 11:12:40.518223
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c2e9a41d5b3'
+down_revision: Union[str, Sequence[str], None] = '045eb2cf421a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.alter_column(
+        "csv_rows",
+        "fields",
+        type_=postgresql.JSONB(),
+        existing_type=sa.JSON(),
+        existing_nullable=True,
+        postgresql_using="fields::jsonb",
+    )
+    op.create_index(
+        "csv_rows_fields_gin",
+        "csv_rows",
+        ["fields"],
+        postgresql_using="gin",
+        postgresql_ops={"fields": "jsonb_path_ops"},
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("csv_rows_fields_gin", table_name="csv_rows")
+    op.alter_column(
+        "csv_rows",
+        "fields",
+        type_=sa.JSON(),
+        existing_type=postgresql.JSONB(),
+        existing_nullable=True,
+        postgresql_using="fields::json",
+    )
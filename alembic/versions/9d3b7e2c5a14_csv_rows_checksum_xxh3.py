@@ -0,0 +1,47 @@
+"""narrow csv_rows.checksum to the 32-char xxh3-128 digest
+
+Row checksums switched from SHA-256 (64 hex chars) to xxh3-128 (32), so
+no stored checksum matches a newly computed one: the first ingest after
+upgrading re-embeds and re-upserts every row once, updating rows in place
+on (file_id, external_id). Old digests are cut to 32 chars to fit; they
+are replaced on that ingest either way.
+
+Revision ID: 9d3b7e2c5a14
+Revises: 4c8d2f6b1a93
+Create Date: 2025-10-07 10:18:52.604117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d3b7e2c5a14'
+down_revision: Union[str, Sequence[str], None] = '4c8d2f6b1a93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.alter_column(
+        "csv_rows",
+        "checksum",
+        existing_type=sa.String(length=64),
+        type_=sa.String(length=32),
+        existing_nullable=False,
+        postgresql_using="left(checksum, 32)",
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.alter_column(
+        "csv_rows",
+        "checksum",
+        existing_type=sa.String(length=32),
+        type_=sa.String(length=64),
+        existing_nullable=False,
+    )
@@ -0,0 +1,57 @@
+"""csv_rows unique (file_id, external_id) instead of unique checksum
+
+Upserts used to conflict on checksum, so a row whose content changed was
+inserted again under the same (file_id, external_id). The newest copy
+(max id) of each pair is kept and the older ones are deleted before the
+constraint is added. Their vectors ("CSVRow:<id>:<n>") are not reachable
+from here and stay in Chroma, where retriever searches can still return
+them: delete them, or re-ingest the affected files into a fresh collection.
+
+Revision ID: b51f0c8e2a17
+Revises: 7c2e9a41d5b3
+Create Date: 2025-10-02 14:37:05.914362
+
+"""
+import logging
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+logger = logging.getLogger("alembic.runtime.migration")
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b51f0c8e2a17'
+down_revision: Union[str, Sequence[str], None] = '7c2e9a41d5b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    deleted = op.get_bind().execute(
+        sa.text(
+            "DELETE FROM csv_rows older USING csv_rows newer "
+            "WHERE older.file_id = newer.file_id "
+            "AND older.external_id = newer.external_id "
+            "AND older.id < newer.id"
+        )
+    )
+    if deleted.rowcount:
+        logger.warning(
+            "Deleted %s superseded csv_rows duplicates; their Chroma vectors need cleanup",
+            deleted.rowcount,
+        )
+    op.drop_index("ix_csv_rows_checksum", table_name="csv_rows")
+    op.create_index("ix_csv_rows_checksum", "csv_rows", ["checksum"], unique=False)
+    op.create_unique_constraint(
+        "uq_csv_rows_file_id_external_id", "csv_rows", ["file_id", "external_id"]
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint("uq_csv_rows_file_id_external_id", "csv_rows", type_="unique")
+    op.drop_index("ix_csv_rows_checksum", table_name="csv_rows")
+    op.create_index("ix_csv_rows_checksum", "csv_rows", ["checksum"], unique=True)
@@ -0,0 +1,28 @@
+"""index csv_rows.vector_id for the search-time row join
+
+Revision ID: e3a7d1c95f20
+Revises: b51f0c8e2a17
+Create Date: 2025-10-03 11:12:48.207631
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e3a7d1c95f20'
+down_revision: Union[str, Sequence[str], None] = 'b51f0c8e2a17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index("ix_csv_rows_vector_id", "csv_rows", ["vector_id"], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_csv_rows_vector_id", table_name="csv_rows")
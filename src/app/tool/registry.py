@@ -1,6 +1,7 @@
 from __future__ import annotations
 import inspect
 import asyncio
+from contextlib import asynccontextmanager
 from typing import Callable, Any, Optional, Iterable, Dict
 from src.helpers.singleton import SingletonMeta
 from src.base.base_tool import BaseTool
@@ -26,7 +27,7 @@ class Registry(metaclass=SingletonMeta):
     def __init__(
         self, name: str = "mcp-server", default_adapter: str = Executor.IN_PROCESS.value
     ):
-        self.mcp = FastMCP(name=name)
+        self.mcp = FastMCP(name=name, lifespan=self._lifespan)
         self.tools: Dict[str, Callable] = {}
         self.instances: Dict[str, BaseTool] = {}
         self.default_adapter = default_adapter
@@ -118,6 +119,28 @@ class Registry(metaclass=SingletonMeta):
         if tasks:
             await asyncio.gather(*tasks)
 
+    async def shutdown_instances(self, instances: Iterable[Any]) -> None:
+        tasks = []
+        for inst in instances:
+            shutdown = getattr(inst, "shutdown", None)
+            if callable(shutdown):
+                ret = shutdown()
+                if inspect.isawaitable(ret):
+                    tasks.append(ret)
+        if tasks:
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+            for result in results:
+                if isinstance(result, Exception):
+                    logger.warning("Tool shutdown failed: %s", result)
+
+    @asynccontextmanager
+    async def _lifespan(self, server: FastMCP):
+        # server teardown releases tool resources (HTTP sessions, pools)
+        try:
+            yield {}
+        finally:
+            await self.shutdown_instances(list(self.instances.values()))
+
     def http_app(self):
         return self.mcp.http_app()
 
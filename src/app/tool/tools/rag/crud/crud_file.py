@@ -1,4 +1,3 @@
-import os
 from typing import Optional, Dict, Any, List
 from sqlalchemy import select, update, insert
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -6,6 +5,7 @@ from sqlalchemy.sql.expression import func
 
 from src.app.tool.tools.rag.models import CSVFile
 from src.helpers.object_to_dict import model_to_dict
+from src.helpers.file_util import normalized_path
 from src.enum.csv_status import FileStatus
 
 
@@ -30,18 +30,21 @@ async def create_csv_file(
     checksum: str,
     status: FileStatus,
     last_row_index: int,
+    mtime_ns: Optional[int] = None,
+    size: Optional[int] = None,
 ) -> Dict[str, Any]:
     """
     Insert new CSVFile record and return mapping.
     """
-    normalized_path = os.path.normpath(path).replace("\\", "/")
     stmt = (
         insert(CSVFile)
         .values(
-            path=normalized_path,
+            path=normalized_path(path),
             checksum=checksum,
             status=status.value,
             last_row_index=last_row_index,
+            mtime_ns=mtime_ns,
+            size=size,
         )
         .returning(CSVFile)
     )
@@ -58,6 +61,8 @@ async def update_csv_file_checksum(
     new_checksum: str,
     status: FileStatus,
     last_row_index: int,
+    mtime_ns: Optional[int] = None,
+    size: Optional[int] = None,
 ) -> Dict[str, Any]:
     """
     Update checksum for existing CSVFile and return mapping.
@@ -66,7 +71,11 @@ async def update_csv_file_checksum(
         update(CSVFile)
         .where(CSVFile.id == file_id)
         .values(
-            checksum=new_checksum, status=status.value, last_row_index=last_row_index
+            checksum=new_checksum,
+            status=status.value,
+            last_row_index=last_row_index,
+            mtime_ns=mtime_ns,
+            size=size,
         )
     )
     sel = select(CSVFile).where(CSVFile.id == file_id)
@@ -76,6 +85,24 @@ async def update_csv_file_checksum(
     return model_to_dict(obj) if obj else None
 
 
+async def update_csv_file_stat(
+    session: AsyncSession, file_id: int, mtime_ns: int, size: int
+) -> Dict[str, Any]:
+    """
+    Record a new stat() snapshot for a file whose content did not change.
+    """
+    stmt = (
+        update(CSVFile)
+        .where(CSVFile.id == file_id)
+        .values(mtime_ns=mtime_ns, size=size)
+        .returning(CSVFile)
+    )
+    res = await session.execute(stmt)
+    obj = res.scalar_one_or_none()
+    await session.commit()
+    return model_to_dict(obj) if obj else None
+
+
 async def update_csv_file_status(
     session, file_id: int, new_status: FileStatus, total_rows: int
 ) -> dict:
@@ -1,49 +1,153 @@
-from typing import Dict, Any, List, Sequence
-from sqlalchemy.dialects.postgresql import insert
+from typing import Dict, Any, List, Sequence, Tuple
+import orjson
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from sqlalchemy import case, update
+from sqlalchemy import any_, bindparam, select, text
+from sqlalchemy import Integer, String
+from sqlalchemy.dialects.postgresql import ARRAY
 
 from src.app.tool.tools.rag.models import CSVRow
+from src.app.tool.tools.rag.schemas import RowBatch
 from src.enum.csv_status import EmbeddingStatus
 
 
+# per-connection staging table for the COPY-based upsert; emptied on commit
+_STAGE_TABLE = "_stage_csv_rows"
+_STAGE_COLUMNS = ["file_id", "external_id", "content", "checksum", "fields"]
+# create + empty in one simple-query message: one round-trip instead of two
+_PREPARE_STAGE = (
+    f"CREATE TEMP TABLE IF NOT EXISTS {_STAGE_TABLE} ("
+    "file_id integer, external_id integer, content text, "
+    "checksum varchar(32), fields jsonb"
+    ") ON COMMIT DELETE ROWS; "
+    f"TRUNCATE {_STAGE_TABLE}"
+)
+_UPSERT_FROM_STAGE = text(
+    # every part of a WITH sees the same snapshot, so prev holds the checksums being replaced
+    "WITH prev AS ("
+    f"SELECT c.id, c.checksum FROM csv_rows c JOIN {_STAGE_TABLE} s "
+    "ON c.file_id = s.file_id AND c.external_id = s.external_id"
+    "), up AS ("
+    "INSERT INTO csv_rows (file_id, external_id, content, checksum, fields, embedding_status) "
+    f"SELECT file_id, external_id, content, checksum, fields, '{EmbeddingStatus.PENDING.value}' "
+    f"FROM {_STAGE_TABLE} "
+    "ON CONFLICT (file_id, external_id) DO UPDATE SET "
+    "checksum = EXCLUDED.checksum, content = EXCLUDED.content, fields = EXCLUDED.fields, "
+    f"embedding_status = '{EmbeddingStatus.PENDING.value}', embedding_error = NULL "
+    # xmax is non-zero only on rows the DO UPDATE branch rewrote
+    "RETURNING id, checksum, xmax <> 0 AS updated"
+    ") "
+    "SELECT up.id, up.checksum, up.updated, prev.checksum FROM up LEFT JOIN prev ON prev.id = up.id"
+)
+
+
+def _copy_records(rows: RowBatch, with_status: bool = False) -> List[tuple]:
+    n = len(rows)
+    columns = [
+        [rows.file_id] * n,
+        rows.external_ids,
+        rows.contents,
+        rows.checksums,
+        [orjson.dumps(f).decode("utf-8") for f in rows.fields],
+    ]
+    if with_status:
+        columns.append([EmbeddingStatus.PENDING.value] * n)
+    return list(zip(*columns))
+
+
+def _last_per_external_id(rows: RowBatch) -> RowBatch:
+    # ON CONFLICT cannot touch the same target row twice in one statement; last row wins
+    last = {eid: i for i, eid in enumerate(rows.external_ids)}
+    if len(last) == len(rows):
+        return rows
+    return rows.take(sorted(last.values()))
+
+
+async def _driver_connection(session: AsyncSession):
+    """The session's underlying asyncpg connection, inside its current transaction."""
+    conn = await session.connection()
+    raw = await conn.get_raw_connection()
+    return raw.driver_connection
+
+
+async def _copy_to(session: AsyncSession, table: str, records: List[tuple], columns: List[str]):
+    driver = await _driver_connection(session)
+    await driver.copy_records_to_table(table, records=records, columns=columns)
+
+
 async def bulk_upsert_rows(
-    session: AsyncSession, rows: List[Dict[str, Any]]
-) -> Dict[str, int]:
+    session: AsyncSession, rows: RowBatch
+) -> Tuple[Dict[str, int], Dict[int, str]]:
     """
     Insert or update rows into csv_rows table.
-    Returns mapping {checksum -> id} (IDs are ints).
-    Uses ON CONFLICT DO UPDATE + RETURNING so we get canonical ids for existing & new rows.
+    Returns mapping {checksum -> id} (IDs are ints) and {id -> previous checksum}
+    for rows that already existed and were updated; those go back to PENDING
+    until their new vectors are written.
+    The batch is COPYed into a temp staging table, then one
+    INSERT ... SELECT ... ON CONFLICT (file_id, external_id) DO UPDATE
+    RETURNING gives canonical ids for existing & new rows; a changed row
+    keeps its id and takes the new checksum. No bind parameters per row,
+    so batch size is not limited by the Postgres parameter cap.
+    Does not commit; the caller owns the transaction.
+    """
+    if not rows:
+        return {}, {}
+
+    rows = _last_per_external_id(rows)
+    # asyncpg sends argument-less execute() as a simple query, so both statements go together
+    await (await _driver_connection(session)).execute(_PREPARE_STAGE)
+    await _copy_to(session, _STAGE_TABLE, _copy_records(rows), _STAGE_COLUMNS)
+
+    res = await session.execute(_UPSERT_FROM_STAGE)
+    chk_to_id: Dict[str, int] = {}
+    updated: Dict[int, str] = {}
+    for db_id, chk, was_updated, prev_chk in res.all():
+        chk_to_id[str(chk)] = int(db_id)
+        if was_updated:
+            updated[int(db_id)] = str(prev_chk)
+    return chk_to_id, updated
+
+
+_COPY_COLUMNS = _STAGE_COLUMNS + ["embedding_status"]
+# arrays instead of IN (...) lists: the SQL text is the same for every batch
+# size, so asyncpg prepares each statement once per connection and reuses it
+_SELECT_IDS_BY_EXTERNAL_ID = select(CSVRow.id, CSVRow.checksum).where(
+    CSVRow.file_id == bindparam("file_id"),
+    CSVRow.external_id == any_(bindparam("external_ids", type_=ARRAY(Integer))),
+)
+_SELECT_BY_VECTOR_IDS = select(CSVRow).where(
+    CSVRow.vector_id == any_(bindparam("vector_ids", type_=ARRAY(String)))
+)
+_MARK_DONE = text(
+    "UPDATE csv_rows AS c SET embedding_status = :status, vector_id = u.vector_id "
+    "FROM unnest(CAST(:ids AS integer[]), CAST(:vector_ids AS varchar[])) AS u(id, vector_id) "
+    "WHERE c.id = u.id"
+)
+
+
+async def copy_insert_rows(session: AsyncSession, rows: RowBatch) -> Dict[str, int]:
+    """
+    Plain bulk insert through COPY ... FROM STDIN (asyncpg copy_records_to_table)
+    for rows known to be new; no per-row parse/plan and no conflict checks.
+    Raises asyncpg UniqueViolationError if any row already exists, so call it
+    inside a savepoint and fall back to bulk_upsert_rows.
+    Returns mapping {checksum -> id}. Does not commit.
     """
     if not rows:
         return {}
 
-    stmt = (
-        insert(CSVRow)
-        .values(rows)
-        .on_conflict_do_update(
-            index_elements=[CSVRow.checksum],
-            set_={
-                "external_id": insert(CSVRow).excluded.external_id,
-                "file_id": insert(CSVRow).excluded.file_id,
-                "content": insert(CSVRow).excluded.content,
-                "fields": insert(CSVRow).excluded.fields,
-            },
-        )
-        .returning(CSVRow.id, CSVRow.checksum)
+    rows = _last_per_external_id(rows)
+    await _copy_to(
+        session,
+        CSVRow.__tablename__,
+        _copy_records(rows, with_status=True),
+        _COPY_COLUMNS,
     )
 
-    res = await session.execute(stmt)
-    
-    mapping: Dict[str, int] = {}
-
-    for row in res.fetchall():
-        db_id = row.id
-        checksum = row.checksum
-        mapping[str(checksum)] = int(db_id)
-    await session.commit()
-    return mapping
+    res = await session.execute(
+        _SELECT_IDS_BY_EXTERNAL_ID,
+        {"file_id": rows.file_id, "external_ids": rows.external_ids},
+    )
+    return {str(chk): int(db_id) for db_id, chk in res.all()}
 
 
 async def mark_rows_done_with_vector(
@@ -53,28 +157,22 @@ async def mark_rows_done_with_vector(
 ):
     """
     Bulk update all given row_ids with DONE status and their vector_ids
-    using a single SQL UPDATE.
+    using a single SQL UPDATE joined to two unnested arrays:
+      UPDATE csv_rows SET ... FROM unnest($ids, $vector_ids) AS u WHERE csv_rows.id = u.id
+    Does not commit; the caller owns the transaction.
     """
     if not row_ids:
         return
 
-    case_expr = case(
-        (CSVRow.id == int(row_id), vec_id)
-        for row_id, vec_id in zip(row_ids, vector_ids)
+    await session.execute(
+        _MARK_DONE,
+        {
+            "status": EmbeddingStatus.DONE.value,
+            "ids": [int(row_id) for row_id in row_ids],
+            "vector_ids": list(vector_ids),
+        },
     )
 
-    stmt = (
-        update(CSVRow)
-        .where(CSVRow.id.in_(list(map(int, row_ids))))
-        .values(
-            embedding_status=EmbeddingStatus.DONE.value,
-            vector_id=case_expr,
-        )
-    )
-
-    await session.execute(stmt)
-    await session.commit()
-
 
 async def select_rows_by_ids(
     session: AsyncSession, ids: List[int]
@@ -91,6 +189,5 @@ async def select_rows_by_ids(
 
 
 async def select_rows_by_vector_ids(session, vector_ids: List[str]):
-    stmt = select(CSVRow).where(CSVRow.vector_id.in_(vector_ids))
-    res = await session.execute(stmt)
+    res = await session.execute(_SELECT_BY_VECTOR_IDS, {"vector_ids": list(vector_ids)})
     return [row.to_dict() for row in res.scalars().all()]
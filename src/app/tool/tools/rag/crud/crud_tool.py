@@ -1,6 +1,6 @@
 import asyncio
-from typing import Optional, List
-from sqlalchemy import select, update, delete
+from typing import Any, Dict, Optional, List, Tuple
+from sqlalchemy import bindparam, func, select, update, delete
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import SQLAlchemyError
 
@@ -118,6 +118,28 @@ async def get_tool_registry(
     return model_to_dict(tool) if tool else None
 
 
+# one round trip for the init lock and the registry lookup:
+# WITH lock AS (SELECT pg_try_advisory_lock(:key) AS acq)
+# SELECT lock.acq, t.* FROM lock LEFT JOIN tool_registry t ON t.name = :name
+_lock = select(func.pg_try_advisory_lock(bindparam("key")).label("acq")).cte("lock")
+_TRY_LOCK_AND_GET_TOOL = (
+    select(_lock.c.acq, ToolRegistry)
+    .select_from(_lock)
+    .outerjoin(ToolRegistry, ToolRegistry.name == bindparam("name"))
+)
+
+
+async def try_lock_and_get_tool_registry(
+    session: AsyncSession, key: int, tool_name: str
+) -> Tuple[bool, Optional[Dict[str, Any]]]:
+    """pg_try_advisory_lock(key) and the tool's registry entry (or None), in one statement."""
+    result = await session.execute(
+        _TRY_LOCK_AND_GET_TOOL, {"key": key, "name": tool_name}
+    )
+    acquired, tool = result.one()
+    return bool(acquired), model_to_dict(tool) if tool else None
+
+
 async def get_all_tools(
     session: AsyncSession, only_enabled: bool = True
 ) -> List[ToolRegistry.to_dict]:
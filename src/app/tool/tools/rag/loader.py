@@ -1,6 +1,7 @@
+import asyncio
 import csv
-import aiofiles
-import aiocsv
+import itertools
+import pandas as pd
 from typing import List, Dict, Iterable, AsyncIterable
 
 
@@ -36,13 +37,81 @@ class CSVLoader:
                 yield cls._format_row(idx, row)
 
     @classmethod
-    async def stream_csv_async(cls, file_path: str) -> AsyncIterable[Dict]:
+    async def stream_csv_async(
+        cls, file_path: str, chunk_rows: int = 1024
+    ) -> AsyncIterable[Dict]:
         """
-        Asynchronous streaming generator using aiofiles + aiocsv.
+        Asynchronous streaming generator over CSV rows.
+        Rows are parsed by csv.DictReader in a worker thread, chunk_rows at a
+        time, so the event loop pays one thread hop per chunk rather than an
+        await per row.
         """
-        async with aiofiles.open(file_path, mode="r", encoding="utf-8-sig") as f:
-            reader = aiocsv.AsyncDictReader(f)
-            idx=0
-            async for row in reader:
-                yield cls._format_row(idx, row)
-                idx += 1
\ No newline at end of file
+        f = await asyncio.to_thread(
+            open, file_path, "r", encoding="utf-8-sig", newline="", buffering=1 << 20
+        )
+        try:
+            reader = csv.DictReader(f)
+            idx = 0
+            while True:
+                rows = await asyncio.to_thread(
+                    lambda: list(itertools.islice(reader, chunk_rows))
+                )
+                if not rows:
+                    break
+                for row in rows:
+                    yield cls._format_row(idx, row)
+                    idx += 1
+        finally:
+            f.close()
+
+    @staticmethod
+    def _open_frames(file_path: str, chunksize: int, skip_rows: int):
+        """
+        Open a chunked pandas reader, skipping the header plus skip_rows rows.
+        Blocking; callers run it in a worker thread.
+        """
+        options = dict(
+            encoding="utf-8-sig",
+            dtype=str,
+            keep_default_na=False,
+            chunksize=chunksize,
+            memory_map=True,
+        )
+        if not skip_rows:
+            return pd.read_csv(file_path, **options)
+        names = pd.read_csv(file_path, encoding="utf-8-sig", nrows=0).columns
+        return pd.read_csv(
+            file_path, header=None, names=names, skiprows=skip_rows + 1, **options
+        )
+
+    @classmethod
+    async def stream_frames_async(
+        cls, file_path: str, chunksize: int = 512, skip_rows: int = 0
+    ) -> AsyncIterable[pd.DataFrame]:
+        """
+        Asynchronous streaming over CSV chunks as DataFrames.
+        Parsing runs in a worker thread; every cell is read as str and empty
+        cells as "" so values match what stream_csv_async yields.
+        The first skip_rows data rows are dropped by the C parser without
+        building them, for resuming a partly ingested file: the header is read
+        once and passed as names so an integer skiprows can skip whole rows
+        instead of testing every line index against a range. The file is
+        memory-mapped, so the parser reads pages straight from the page cache,
+        and the next frame is parsed while the caller works on the current one.
+        """
+        reader = await asyncio.to_thread(
+            cls._open_frames, file_path, chunksize, skip_rows
+        )
+        # one frame of read-ahead; a single pending next() keeps reader access serial
+        ahead = asyncio.ensure_future(asyncio.to_thread(next, reader, None))
+        try:
+            while True:
+                df = await ahead
+                if df is None:
+                    break
+                ahead = asyncio.ensure_future(asyncio.to_thread(next, reader, None))
+                yield df.fillna("")
+        finally:
+            # a worker thread cannot be cancelled; let the pending parse finish before closing
+            await asyncio.gather(ahead, return_exceptions=True)
+            reader.close()
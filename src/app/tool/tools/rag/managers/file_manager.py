@@ -1,4 +1,5 @@
 import asyncio
+import os
 from typing import List, Dict
 
 
@@ -16,6 +17,7 @@ from src.app.tool.tools.rag.crud.crud_file import (
     get_csv_file,
     create_csv_file,
     update_csv_file_checksum,
+    update_csv_file_stat,
     update_csv_file_status,
 )
 
@@ -35,9 +37,24 @@ class CSVFileManager:
 
     async def get_or_register_file(self, session: AsyncSession, file_path: str) -> Dict:
         norm_path = normalized_path(file_path)
-        checksum = await self.compute_file_checksum(norm_path)
+        st = await asyncio.to_thread(os.stat, norm_path)
         existing = await get_csv_file(session, norm_path)
 
+        # same mtime and size as when last hashed: treat as unchanged without reading it
+        if (
+            existing
+            and existing.get("mtime_ns") == st.st_mtime_ns
+            and existing.get("size") == st.st_size
+        ):
+            logger.info(
+                "CSV file unchanged: %s (status=%s)",
+                norm_path,
+                existing.get("status"),
+            )
+            return existing
+
+        checksum = await self.compute_file_checksum(norm_path)
+
         if not existing:
             created = await create_csv_file(
                 session,
@@ -45,9 +62,12 @@ class CSVFileManager:
                 checksum=checksum,
                 status=FileStatus.PENDING,
                 last_row_index=0,
+                mtime_ns=st.st_mtime_ns,
+                size=st.st_size,
             )
             logger.info("Registered new CSV file: %s", norm_path)
-            return created
+            # a changed file is also reset to PENDING/0; only this path has nothing embedded
+            return {**created, "new": True}
 
         if existing.get("checksum") != checksum:
             updated = await update_csv_file_checksum(
@@ -56,10 +76,16 @@ class CSVFileManager:
                 new_checksum=checksum,
                 status=FileStatus.PENDING,
                 last_row_index=0,
+                mtime_ns=st.st_mtime_ns,
+                size=st.st_size,
             )
             logger.info("CSV file changed, will re-ingest: %s", norm_path)
             return updated
 
+        # touched but identical (or hashed before stats were stored): remember the stat
+        existing = await update_csv_file_stat(
+            session, existing["id"], st.st_mtime_ns, st.st_size
+        )
         logger.info(
             "CSV file unchanged: %s (status=%s)",
             norm_path,
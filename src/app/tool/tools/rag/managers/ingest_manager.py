@@ -1,8 +1,19 @@
 import asyncio
-import hashlib
-from typing import Dict, Any, List, Iterable, AsyncIterable, Union, Tuple, Sequence, Optional
-
-from sqlalchemy import update
+import ctypes
+import gc
+import itertools
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from functools import partial
+from typing import Dict, Any, FrozenSet, List, Iterable, AsyncIterable, Union, Tuple, Sequence, Optional, Set
+
+import numpy as np
+import xxhash
+from cachetools import LRUCache
+from sqlalchemy import Integer, String, any_, bindparam, select, text, update
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from langchain.schema import Document
@@ -11,80 +22,155 @@ from langchain.text_splitter import RecursiveCharacterTextSplitter
 from src.app.tool.tools.rag.models import CSVFile, CSVRow
 from src.config.logger import logging
 from src.enum.csv_status import EmbeddingStatus
-from src.app.tool.tools.rag.crud.crud_row import bulk_upsert_rows
-from src.services.embedding import row_checksum
-from src.services.embedding import prepare_text_for_embedding
-from src.app.tool.tools.rag.schemas import IncomingRow, PreparedRow, FileMeta
+from src.app.tool.tools.rag.crud.crud_row import (
+    bulk_upsert_rows,
+    copy_insert_rows,
+    mark_rows_done_with_vector,
+)
+from src.services.embedding import row_checksum, frame_checksums, embed_texts_async
+from src.services.embedding import CHARS_PER_TOKEN, get_tokenizer, split_by_tokens
+from src.services.embedding import prepare_text_for_embedding, ignored_keys_for
+from src.app.tool.tools.rag.schemas import IncomingRow, RowBatch, FileMeta
 from src.config import Database, db as global_db
+from src.config.settings import settings
 
 logger = logging.getLogger(__name__)
 
+# end-of-stream marker between ingest pipeline stages
+_STOP = None
+
+try:
+    _libc = ctypes.CDLL("libc.so.6")
+except OSError:  # non-glibc platforms
+    _libc = None
+
+
+def _release_memory():
+    """Collect cyclic garbage and hand freed heap pages back to the OS (glibc only)."""
+    gc.collect()
+    if _libc is not None:
+        _libc.malloc_trim(0)
+
 
 # ---------------- RowStreamer ----------------
 class RowStreamer:
-    def __init__(self, start_index: int = 0):
+    """
+    Batches incoming rows for the writer. Rows before start_index are dropped
+    here unless the source was already opened at the resume point
+    (skip_source=False).
+    """
+
+    def __init__(self, start_index: int = 0, skip_source: bool = True):
         self.start_index = start_index
+        self.skip_source = skip_source
+        self._ignored: Optional[FrozenSet[str]] = None
 
-    async def stream_batches(
-        self,
+    @staticmethod
+    async def _raw_batches(
         rows: Union[Iterable[IncomingRow], AsyncIterable[IncomingRow]],
-        file_id: int,
-        batch_size: int = 512,
-    ) -> AsyncIterable[
-        Tuple[List[PreparedRow], List[str], List[str], List[Dict[str, Any]], int]
-    ]:
-        async def _aiter():
-            if hasattr(rows, "__aiter__"):
-                async for r in rows:
-                    yield r
-            else:
-                for r in rows:
-                    yield r
-
-        row_counter = self.start_index
-        buffer: List[PreparedRow] = []
-        checksums: List[str] = []
-        texts: List[str] = []
-        metas: List[Dict[str, Any]] = []
+        skip: int,
+        batch_size: int,
+    ) -> AsyncIterable[List[IncomingRow]]:
+        """Group the source into lists of batch_size rows, dropping the first `skip`."""
+        if hasattr(rows, "__aiter__"):
+            # fill a pre-sized list by index; a fresh one per batch since the consumer keeps it
+            raw: List[IncomingRow] = [None] * batch_size
+            n = 0
+            async for r in rows:
+                if skip:
+                    skip -= 1
+                    continue
+                raw[n] = r
+                n += 1
+                if n == batch_size:
+                    yield raw
+                    raw = [None] * batch_size
+                    n = 0
+            if n:
+                yield raw[:n]
+            return
 
-        async for r in _aiter():
+        # sync sources are sliced in C; no per-row coroutine step
+        it = itertools.islice(rows, skip, None)
+        while True:
+            raw = list(itertools.islice(it, batch_size))
+            if not raw:
+                return
+            yield raw
+
+    def _prepare(self, raw: List[IncomingRow], file_id: int) -> RowBatch:
+        """Checksum and build embedding text for one raw batch, dropping duplicate rows."""
+        if self._ignored is None:
+            self._ignored = ignored_keys_for(raw[0]["metadata"].keys())
+        ignored = self._ignored
+        checksum, prepare = row_checksum, prepare_text_for_embedding
+
+        batch = RowBatch(file_id)
+        append = batch.append
+        seen: Set[str] = set()
+        for r in raw:
             original_row = r["metadata"]
             original_row["file_id"] = file_id
-
-            row_counter += 1
-            if row_counter <= self.start_index:
+            # frame-based loaders precompute checksums column-wise
+            chk = r.get("checksum") or checksum(original_row)
+            if chk in seen:
                 continue
+            seen.add(chk)
+            # the loader yields a fresh dict per row; store it as-is rather than copying
+            append(int(original_row["external_id"]), prepare(original_row, ignored), chk, original_row)
+        return batch
 
-            chk = row_checksum(original_row)
-            content = prepare_text_for_embedding(original_row)
-
-            buffer.append(
-                {
-                    "file_id": original_row.get("file_id"),
-                    "external_id": int(original_row.get("external_id")),
-                    "content": content,
-                    "checksum": chk,
-                    "fields": dict(original_row),
-                }
-            )
-            checksums.append(chk)
-            texts.append(content)
-            metas.append({"row_checksum": chk})
-
-            if len(buffer) >= batch_size:
-                yield buffer, checksums, texts, metas, row_counter
-                buffer, checksums, texts, metas = [], [], [], []
-
-        if buffer:
-            yield buffer, checksums, texts, metas, row_counter
+    async def stream_batches(
+        self,
+        rows: Union[Iterable[IncomingRow], AsyncIterable[IncomingRow]],
+        file_id: int,
+        batch_size: int = 512,
+    ) -> AsyncIterable[Tuple[RowBatch, int]]:
+        skip = self.start_index if self.skip_source else 0
+        row_counter = self.start_index
+        async for raw in self._raw_batches(rows, skip, batch_size):
+            row_counter += len(raw)
+            # pure-Python per-row work; run it beside the event loop, not on it
+            yield await asyncio.to_thread(self._prepare, raw, file_id), row_counter
 
 
 # ---------------- RowRepository ----------------
 class RowRepository:
+    """
+    Batch-level DB writes. None of these commit: ingest_rows owns the
+    transaction and commits once per batch.
+    Statements are built once at class level so every batch hits
+    SQLAlchemy's compiled cache instead of rebuilding the construct.
+    """
+
+    _MARK_FAILED = (
+        update(CSVRow)
+        .where(CSVRow.checksum == any_(bindparam("checksums", type_=ARRAY(String))))
+        .values(embedding_status=bindparam("status"), embedding_error=bindparam("error"))
+        .execution_options(synchronize_session=False)
+    )
+    _SELECT_DONE_BY_CHECKSUM = select(CSVRow.checksum, CSVRow.vector_id).where(
+        CSVRow.file_id == bindparam("file_id"),
+        CSVRow.checksum == any_(bindparam("checksums", type_=ARRAY(String))),
+        CSVRow.embedding_status == EmbeddingStatus.DONE.value,
+    )
+    _SELECT_FILE_IDS = select(CSVRow.id, CSVRow.file_id).where(
+        CSVRow.id == any_(bindparam("ids", type_=ARRAY(Integer)))
+    )
+    _SET_LAST_ROW = (
+        update(CSVFile)
+        .where(CSVFile.id == bindparam("file_id"))
+        .values(last_row_index=bindparam("row_index"))
+        .execution_options(synchronize_session=False)
+    )
+
     async def bulk_upsert(
-        self, session: AsyncSession, buffer: List[PreparedRow]
-    ) -> Dict[str, int]:
-        return await bulk_upsert_rows(session, buffer) or {}
+        self, session: AsyncSession, buffer: RowBatch
+    ) -> Tuple[Dict[str, int], Dict[int, str]]:
+        return await bulk_upsert_rows(session, buffer)
+
+    async def copy_insert(self, session: AsyncSession, buffer: RowBatch) -> Dict[str, int]:
+        return await copy_insert_rows(session, buffer)
 
     async def mark_checksums_failed(
         self, session: AsyncSession, checksums: Sequence[str], error_text: str
@@ -92,35 +178,61 @@ class RowRepository:
         if not checksums:
             return
         await session.execute(
-            update(CSVRow)
-            .where(CSVRow.checksum.in_(list(checksums)))
-            .values(
-                embedding_status=EmbeddingStatus.FAILED.value,
-                embedding_error=error_text,
-            )
+            self._MARK_FAILED,
+            {
+                "checksums": list(checksums),
+                "status": EmbeddingStatus.FAILED.value,
+                "error": error_text,
+            },
         )
-        await session.commit()
 
     async def mark_rows_done_with_vector(
         self, session: AsyncSession, row_ids: Sequence[int], vector_ids: Sequence[str]
     ):
-        for row_id, vec_id in zip(row_ids, vector_ids):
-            await session.execute(
-                update(CSVRow)
-                .where(CSVRow.id == int(row_id))
-                .values(embedding_status=EmbeddingStatus.DONE.value, vector_id=vec_id)
+        # one UPDATE ... FROM unnest(...) statement for the whole flush
+        await mark_rows_done_with_vector(session, row_ids, vector_ids)
+
+    async def done_checksums(
+        self, session: AsyncSession, file_id: int, checksums: Sequence[str]
+    ) -> Dict[str, str]:
+        """{checksum: vector_id} for the given checksums that are already embedded, in one query."""
+        if not checksums:
+            return {}
+        res = await session.execute(
+            self._SELECT_DONE_BY_CHECKSUM,
+            {"file_id": file_id, "checksums": list(checksums)},
+        )
+        return {chk: vec_id for chk, vec_id in res.all()}
+
+    async def iter_done_checksums(
+        self, session: AsyncSession, file_id: int
+    ) -> AsyncIterable[Tuple[str, str]]:
+        """(checksum, vector_id) of the file's embedded rows, via a server-side cursor."""
+        result = await session.stream(
+            select(CSVRow.checksum, CSVRow.vector_id).where(
+                CSVRow.file_id == file_id,
+                CSVRow.embedding_status == EmbeddingStatus.DONE.value,
             )
-        await session.commit()
+        )
+        async for chk, vec_id in result:
+            yield chk, vec_id
+
+    async def file_ids_for_rows(
+        self, session: AsyncSession, row_ids: Iterable[int]
+    ) -> Dict[int, int]:
+        """{row_id: file_id} for the rows that still exist, in one query."""
+        ids = list(row_ids)
+        if not ids:
+            return {}
+        res = await session.execute(self._SELECT_FILE_IDS, {"ids": ids})
+        return {row_id: file_id for row_id, file_id in res.all()}
 
     async def update_last_row_index(
         self, session: AsyncSession, file_id: int, last_row_index: int
     ):
         await session.execute(
-            update(CSVFile)
-            .where(CSVFile.id == file_id)
-            .values(last_row_index=last_row_index)
+            self._SET_LAST_ROW, {"file_id": file_id, "row_index": last_row_index}
         )
-        await session.commit()
 
 
 # ---------------- VectorStore adapter ----------------
@@ -129,10 +241,17 @@ class VectorStoreAdapter:
     Adapter that:
       - preferred: async LangChain-style add (aadd_documents)
       - fallback: sync add_documents in a threadpool
+
+    Blocking store calls run on a dedicated single-thread executor: writes
+    reach the store in order and never queue behind the embedding encodes
+    that use the default pool.
     """
 
-    def __init__(self, vs_client):
+    def __init__(self, vs_client, executor: Optional[ThreadPoolExecutor] = None):
         self.vs = vs_client
+        self._executor = executor or ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="vsadd"
+        )
 
     async def add_documents(self, docs: List[Document], ids: Optional[List[str]] = None):
         add_async = getattr(self.vs, "aadd_documents", None)
@@ -156,11 +275,85 @@ class VectorStoreAdapter:
                     return add_sync(docs)
                 except TypeError:
                     return add_sync(docs)
-            await loop.run_in_executor(None, _call)
+            await loop.run_in_executor(self._executor, _call)
             return
 
         raise RuntimeError("Vector store does not support add_documents/aadd_documents")
 
+    async def add_embeddings(
+        self,
+        ids: List[str],
+        embeddings: np.ndarray,
+        metadatas: List[Dict[str, Any]],
+        documents: List[str],
+    ):
+        """
+        Persist precomputed vectors, preferring the store's batched add_batch.
+        Stores without add_batch/add_embeddings fall back to add_documents
+        and embed the texts themselves.
+        """
+        add_batch = getattr(self.vs, "add_batch", None)
+        add = getattr(self.vs, "add_embeddings", None)
+        if callable(add_batch) or callable(add):
+            call = (
+                partial(add_batch, ids, embeddings, metadatas=metadatas, documents=documents)
+                if callable(add_batch)
+                else partial(add, embeddings, metadatas=metadatas, ids=ids, documents=documents)
+            )
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(self._executor, call)
+            return
+
+        docs = [Document(page_content=t, metadata=m) for t, m in zip(documents, metadatas)]
+        await self.add_documents(docs, ids=ids)
+
+    async def delete_stale_chunks(self, row_ids: Sequence[int], keep_ids: Sequence[str]):
+        """
+        Delete vectors of `row_ids` whose ids are not in `keep_ids`. Runs on the
+        write executor, so it sees the upsert that preceded it.
+        """
+        get_ids = getattr(self.vs, "ids_where", None)
+        delete = getattr(self.vs, "delete_batch", None)
+        if not (callable(get_ids) and callable(delete)):
+            return
+
+        def _call():
+            keep = set(keep_ids)
+            stale = [
+                vec_id
+                for vec_id in get_ids({"row_id": {"$in": list(row_ids)}})
+                if vec_id not in keep
+            ]
+            if stale:
+                delete(stale)
+
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._executor, _call)
+
+
+class _PendingVectors:
+    """Chunk vectors upserted in the DB but not yet written to the vector store."""
+
+    def __init__(self):
+        self.ids: List[str] = []
+        self.embs: List[np.ndarray] = []
+        self.metas: List[Dict[str, Any]] = []
+        self.texts: List[str] = []
+        self.row_ids: List[int] = []
+        self.vec_ids: List[str] = []
+        # row checksum per row_ids entry; cached once the vectors are stored
+        self.row_checksums: List[str] = []
+        # rows that existed before this run; chunks past their new count are stale
+        self.updated_row_ids: List[int] = []
+        self.last_row_index: Optional[int] = None
+        self.started = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def age(self) -> float:
+        return time.monotonic() - self.started
+
 
 # ---------------- CSVIngestManager (main) ----------------
 class CSVIngestManager:
@@ -168,17 +361,198 @@ class CSVIngestManager:
     - chunk per-row into smaller pieces with RecursiveCharacterTextSplitter
     - persist chunk vectors with deterministic ids "CSVRow:{row_id}:{chunk_idx}"
     - keep CSVRow.vector_id = "CSVRow:{row_id}" for backward compatibility
+
+    ingest_rows runs four stages connected by bounded queues so embedding
+    of batch N+1 overlaps the DB/vector-store writes of batch N:
+      producer (stream + cache filter) -> splitter (worker thread)
+        -> embedder -> writer (upsert, vs add, mark done)
+
+    The writer accumulates vectors across DB batches and writes them to the
+    vector store in one call once vs_batch_size is reached or the oldest
+    staged batch is vs_flush_seconds old; mark-done and the commit happen in
+    the same flush so vector ids and rows stay consistent.
+
+    Stores that support shard() get one collection per file ("file_<id>").
+
+    Row checksums known to be embedded are kept in an LRU (checksum -> parent
+    vector id), filled from each flush and warmed from the DB before a
+    re-ingest; rows that hit it are dropped before upsert and embedding.
+    Chunk vectors are also kept in an LRU keyed by a hash of the chunk text,
+    so identical text in other rows or in edited rows is not re-embedded.
     """
 
-    def __init__(self, vector_store):
+    def __init__(
+        self,
+        vector_store,
+        queue_size: Optional[int] = None,
+        vs_batch_size: Optional[int] = None,
+        vs_flush_seconds: Optional[float] = None,
+        checksum_cache_size: int = 1_000_000,
+        gc_every: int = 50,
+    ):
         self.db: Database = global_db
         self.vs = vector_store
         self.repo = RowRepository()
         self.vs_adapter = VectorStoreAdapter(self.vs)
-        self.splitter = RecursiveCharacterTextSplitter(chunk_size=800, chunk_overlap=64)
+        self._file_adapters: Dict[int, VectorStoreAdapter] = {}
+        self.chunk_size, self.chunk_overlap = 800, 64
+        # fallback when the model's tokenizer cannot be loaded
+        self.splitter = RecursiveCharacterTextSplitter(
+            chunk_size=self.chunk_size, chunk_overlap=self.chunk_overlap
+        )
+        self.queue_size = queue_size or settings.ingest_queue_size
+        self.vs_batch_size = vs_batch_size or settings.ingest_vs_batch_size
+        self.vs_flush_seconds = vs_flush_seconds or settings.ingest_vs_flush_seconds
+        self._vec_cache: LRUCache = LRUCache(maxsize=checksum_cache_size)
+        # xxh3-128 digest of chunk text -> float16 vector (half the RSS; error < 1e-3)
+        self._emb_cache: LRUCache = LRUCache(maxsize=max(1, settings.embedding_cache_size))
+        # long ingests fragment the heap (row dicts, ndarrays, ORM rows); trim every N flushes
+        self.gc_every = gc_every
+        self._flushes_since_gc = 0
+
+    def _adapter_for(self, file_id: int) -> VectorStoreAdapter:
+        """Adapter over the file's own shard; writes still share one executor."""
+        shard = getattr(self.vs, "shard", None)
+        if not callable(shard):
+            return self.vs_adapter
+        adapter = self._file_adapters.get(file_id)
+        if adapter is None:
+            adapter = VectorStoreAdapter(
+                shard(f"file_{file_id}"), executor=self.vs_adapter._executor
+            )
+            self._file_adapters[file_id] = adapter
+        return adapter
+
+    async def shard_legacy_vectors(self, session: AsyncSession, page_size: int = 1000) -> int:
+        """
+        Move vectors written before sharding from the shared collection into
+        their file's shard, so per-file queries only need the shard. Their
+        metadata has no file_id, so owners come from csv_rows; vectors whose
+        row is gone are dropped. Each page is deleted only after it was
+        copied, so an interrupted run resumes where it stopped.
+        """
+        if not callable(getattr(self.vs, "shard", None)):
+            return 0
+        loop = asyncio.get_running_loop()
+        executor = self.vs_adapter._executor
+        moved = 0
+        while True:
+            page = await loop.run_in_executor(executor, self.vs.get_page, page_size)
+            ids = page["ids"]
+            if not ids:
+                break
+            metas = page["metadatas"]
+            owners = await self.repo.file_ids_for_rows(
+                session, {int(m["row_id"]) for m in metas if m and "row_id" in m}
+            )
+            by_file: Dict[int, List[int]] = defaultdict(list)
+            for i, meta in enumerate(metas):
+                file_id = owners.get(int(meta["row_id"])) if meta and "row_id" in meta else None
+                if file_id is not None:
+                    by_file[file_id].append(i)
+
+            embeddings = np.asarray(page["embeddings"], dtype=np.float32)
+            for file_id, idx in by_file.items():
+                await loop.run_in_executor(
+                    executor,
+                    partial(
+                        self.vs.shard(f"file_{file_id}").add_batch,
+                        [ids[i] for i in idx],
+                        embeddings[idx],
+                        [metas[i] for i in idx],
+                        [page["documents"][i] for i in idx],
+                    ),
+                )
+                moved += len(idx)
+            await loop.run_in_executor(executor, self.vs.delete_batch, ids)
+
+        if moved:
+            logger.info("Moved %s pre-sharding vectors into per-file shards", moved)
+        return moved
+
+    async def _warm_cache(self, session: AsyncSession, file_id: int):
+        """Load the file's already-embedded checksums so unchanged rows are skipped."""
+        n = 0
+        async for chk, vec_id in self.repo.iter_done_checksums(session, file_id):
+            self._vec_cache[chk] = vec_id
+            n += 1
+        logger.info("Checksum cache warmed with %s rows for file_id=%s", n, file_id)
+
+    async def _embed_chunks(self, texts: List[str]) -> np.ndarray:
+        """embed_texts_async for chunk texts, sending only texts not embedded before."""
+        if not settings.embedding_cache_size:
+            return await embed_texts_async(texts)
+
+        keys = [xxhash.xxh3_128_digest(t.encode("utf-8")) for t in texts]
+        found: Dict[bytes, np.ndarray] = {}
+        missing: Dict[bytes, str] = {}
+        for key, chunk_text in zip(keys, texts):
+            if key in found or key in missing:
+                continue
+            vec = self._emb_cache.get(key)
+            if vec is None:
+                missing[key] = chunk_text
+            else:
+                found[key] = vec
+
+        if missing:
+            embs = await embed_texts_async(list(missing.values()))
+            for key, vec in zip(missing, embs):
+                found[key] = vec
+                # astype copies, so a cached row does not pin the whole batch matrix
+                self._emb_cache[key] = vec.astype(np.float16)
+        return np.stack([found[key] for key in keys]).astype(np.float32, copy=False)
+
+    async def _begin_txn(self, session: AsyncSession):
+        """
+        Per-transaction setup for ingest writes: one flush = one transaction,
+        and its commit need not wait for the WAL fsync (see settings).
+        """
+        if not settings.ingest_synchronous_commit:
+            await session.execute(text("SET LOCAL synchronous_commit TO OFF"))
+
+    async def _finish_batch(
+        self, session: AsyncSession, file_id: int, last_row_index: int
+    ):
+        """Advance the resume pointer and commit everything staged since the last flush."""
+        await self.repo.update_last_row_index(session, file_id, last_row_index)
+        await session.commit()
+        await self._begin_txn(session)
+
+    def _split_long(self, texts: List[str]) -> List[List[str]]:
+        tok = get_tokenizer()
+        if tok is None:
+            return [self.splitter.split_text(t) for t in texts]
+        return split_by_tokens(
+            texts,
+            self.chunk_size // CHARS_PER_TOKEN,
+            self.chunk_overlap // CHARS_PER_TOKEN,
+            tok,
+        )
 
-    def _chunk_checksum(self, text: str) -> str:
-        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+    def _split_rows(self, buffer: RowBatch) -> List[Tuple[str, int, str]]:
+        """
+        Split row contents into (row_checksum, chunk_index, text) chunks.
+        Most CSV rows fit one chunk and are passed through; only longer ones
+        go through the model's tokenizer in one batched call.
+        """
+        chunks: List[Tuple[str, int, str]] = []
+        long_chks: List[str] = []
+        long_texts: List[str] = []
+        for content, chk in zip(buffer.contents, buffer.checksums):
+            stripped = content.strip()
+            if not stripped:
+                continue
+            if len(stripped) <= self.chunk_size:
+                chunks.append((chk, 0, stripped))
+            else:
+                long_chks.append(chk)
+                long_texts.append(stripped)
+
+        if long_texts:
+            for chk, pieces in zip(long_chks, self._split_long(long_texts)):
+                chunks.extend((chk, idx, piece) for idx, piece in enumerate(pieces))
+        return chunks
 
     async def ingest_rows(
         self,
@@ -186,92 +560,282 @@ class CSVIngestManager:
         rows: Union[Iterable[IncomingRow], AsyncIterable[IncomingRow]],
         file_meta: FileMeta,
         batch_size: int = 512,
+        source_at_resume: bool = False,
     ):
-        start_index = file_meta.get("last_row_index", 0)
+        """
+        batch_size is the DB upsert batch; the embedding service sizes its
+        own encode batches independently.
+        Pass source_at_resume=True when `rows` already starts after
+        file_meta["last_row_index"] (e.g. the loader skipped them itself).
+        """
+        start_index = file_meta.get("last_row_index") or 0
         file_id = file_meta.get("id")
-        streamer = RowStreamer(start_index=start_index)
-
-        async for (
-            buffer,
-            checksums,
-            texts,
-            metas,
-            current_row_counter,
-        ) in streamer.stream_batches(rows, file_id, batch_size=batch_size):
-            try:
-                # 1) Upsert rows (one DB row per original CSV row)
-                chk_to_dbid = await self.repo.bulk_upsert(session, buffer)
-            except Exception:
-                logger.exception("bulk_upsert_rows failed for file_id=%s", file_id)
-                await self.repo.update_last_row_index(session, file_id, current_row_counter)
-                continue
-
-            # 2) Build Documents (one doc per original row) and run splitter to produce chunks
-            docs_for_split = []
-            row_checksum_map = {}
-            for row in buffer:
-                dbid = chk_to_dbid.get(row["checksum"])
-                if not dbid:
-                    continue
-                doc = Document(page_content=row["content"], metadata={"row_id": dbid, **row["fields"]})
-                docs_for_split.append(doc)
-                row_checksum_map[dbid] = row["checksum"]
-
-            if not docs_for_split:
-                await self.repo.update_last_row_index(session, file_id, current_row_counter)
-                continue
-
-            chunk_docs = self.splitter.split_documents(docs_for_split)
-
-            # 3) Construct deterministic ids + metadata
-            row_chunk_counters: Dict[int, int] = {}
-            vs_docs: List[Document] = []
-            vs_ids: List[str] = []
-            row_ids_for_vs: List[int] = []
-            vec_ids_for_db_update: List[str] = []
+        streamer = RowStreamer(start_index=start_index, skip_source=not source_at_resume)
+
+        q_split: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        q_embed: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        q_write: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+
+        # a never-ingested file can take the COPY path until the first conflict;
+        # a changed file re-registered as PENDING still has embedded rows to reuse
+        fresh = bool(file_meta.get("new")) and start_index == 0
+        if not fresh:
+            await self._warm_cache(session, file_id)
+
+        # a fresh file has nothing embedded yet, so its cache misses need no lookup
+        lookup_misses = not fresh
+
+        async def producer():
+            # the writer owns `session`; misses are settled on one separate session
+            async with (self.db.session() if lookup_misses else nullcontext()) as lookup:
+                async for buffer, current_row_counter in streamer.stream_batches(
+                    rows, file_id, batch_size=batch_size
+                ):
+                    if lookup is not None:
+                        # the bounded cache may not hold every embedded row (evicted
+                        # entries); settle its misses with one ANY() lookup per batch
+                        misses = [chk for chk in buffer.checksums if chk not in self._vec_cache]
+                        if misses:
+                            self._vec_cache.update(
+                                await self.repo.done_checksums(lookup, file_id, misses)
+                            )
+                    # already embedded and unchanged: no upsert, no embedding
+                    keep = [i for i, chk in enumerate(buffer.checksums) if chk not in self._vec_cache]
+                    if len(keep) < len(buffer):
+                        buffer = buffer.take(keep)
+                    await q_split.put((buffer, current_row_counter))
+            await q_split.put(_STOP)
+
+        async def splitter():
+            while True:
+                item = await q_split.get()
+                if item is _STOP:
+                    await q_embed.put(_STOP)
+                    return
+                buffer, current_row_counter = item
+                # tokenizing long rows is CPU work; keep it off the event loop
+                chunks = await asyncio.to_thread(self._split_rows, buffer) if buffer else []
+                await q_embed.put((buffer, chunks, current_row_counter))
+
+        async def embedder():
+            while True:
+                item = await q_embed.get()
+                if item is _STOP:
+                    await q_write.put(_STOP)
+                    return
+                buffer, chunks, current_row_counter = item
+                embs, error = None, None
+                if chunks:
+                    try:
+                        embs = await self._embed_chunks([c[2] for c in chunks])
+                    except Exception as e:
+                        logger.exception("Embedding failed for file_id=%s: %s", file_id, e)
+                        error = str(e)
+                await q_write.put((buffer, chunks, embs, error, current_row_counter))
+
+        async def writer():
+            nonlocal fresh
+            pending = _PendingVectors()
+            await self._begin_txn(session)
+            while True:
+                item = await q_write.get()
+                if item is _STOP:
+                    await self._flush_pending(session, file_id, pending)
+                    return
+                fresh = await self._write_batch(session, file_id, pending, fresh, *item)
+                if (
+                    len(pending) >= self.vs_batch_size
+                    or pending.age() >= self.vs_flush_seconds
+                ):
+                    await self._flush_pending(session, file_id, pending)
+                    pending = _PendingVectors()
+                    self._flushes_since_gc += 1
+                    if self.gc_every and self._flushes_since_gc >= self.gc_every:
+                        self._flushes_since_gc = 0
+                        _release_memory()
+
+        tasks = [
+            asyncio.create_task(producer()),
+            asyncio.create_task(splitter()),
+            asyncio.create_task(embedder()),
+            asyncio.create_task(writer()),
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for t in tasks:
+                t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
 
-            for cd in chunk_docs:
-                row_id = cd.metadata.get("row_id")
-                if row_id is None:
-                    continue
-                idx = row_chunk_counters.get(row_id, 0)
-                vec_id = f"CSVRow:{row_id}:{idx}"
-
-                meta = {
-                    "row_id": row_id,
-                    "row_checksum": row_checksum_map.get(row_id),
-                    "chunk_index": idx,
-                }
+        logger.info("Completed ingest_rows for file_id=%s", file_meta.get("id"))
 
-                vs_docs.append(Document(page_content=cd.page_content, metadata=meta))
-                vs_ids.append(vec_id)
+    async def ingest_frames(
+        self,
+        session: AsyncSession,
+        frames: AsyncIterable[Any],
+        file_meta: FileMeta,
+        batch_size: int = 512,
+        source_at_resume: bool = False,
+    ):
+        """
+        ingest_rows for DataFrame chunks (CSVLoader.stream_frames_async):
+        checksums are computed per frame instead of per row, in a worker
+        thread so the event loop keeps serving DB and embedding I/O.
+        """
+        file_id = file_meta.get("id")
 
-                if row_id not in row_ids_for_vs:
-                    row_ids_for_vs.append(row_id)
-                    vec_ids_for_db_update.append(f"CSVRow:{row_id}")
+        def _prepare(df) -> Tuple[List[Dict[str, Any]], List[str]]:
+            return df.to_dict("records"), frame_checksums(df, file_id)
+
+        async def _rows():
+            async for df in frames:
+                records, checksums = await asyncio.to_thread(_prepare, df)
+                for rec, chk in zip(records, checksums):
+                    yield {"metadata": rec, "checksum": chk}
+
+        await self.ingest_rows(
+            session,
+            _rows(),
+            file_meta,
+            batch_size=batch_size,
+            source_at_resume=source_at_resume,
+        )
 
-                row_chunk_counters[row_id] = idx + 1
+    async def _write_batch(
+        self,
+        session: AsyncSession,
+        file_id: int,
+        pending: _PendingVectors,
+        use_copy: bool,
+        buffer: RowBatch,
+        chunks: List[Tuple[str, int, str]],
+        embs: Optional[np.ndarray],
+        error: Optional[str],
+        current_row_counter: int,
+    ) -> bool:
+        """
+        Write one batch's rows and stage its vectors in `pending` for the next
+        flush. Returns whether the following batch may still use COPY.
+        """
+        pending.last_row_index = current_row_counter
+        if not buffer:
+            return use_copy
+
+        # 1) Insert rows (one DB row per original CSV row). Each attempt runs in
+        #    a savepoint so earlier, not yet flushed batches survive a failure.
+        chk_to_dbid: Optional[Dict[str, int]] = None
+        updated: Dict[int, str] = {}
+        if use_copy:
+            try:
+                async with session.begin_nested():
+                    chk_to_dbid = await self.repo.copy_insert(session, buffer)
+            except Exception as e:
+                logger.info("COPY insert hit existing rows for file_id=%s, upserting: %s", file_id, e)
+                use_copy = False
 
-            if not vs_docs:
-                await self.repo.update_last_row_index(session, file_id, current_row_counter)
+        if chk_to_dbid is None:
+            try:
+                async with session.begin_nested():
+                    chk_to_dbid, updated = await self.repo.bulk_upsert(session, buffer)
+            except Exception:
+                logger.exception("bulk_upsert_rows failed for file_id=%s", file_id)
+                return use_copy
+            # the replaced content is gone from the DB; a later revert to it must not hit the cache
+            for prev_chk in updated.values():
+                self._vec_cache.pop(prev_chk, None)
+
+        # 2) Construct deterministic ids + metadata for every chunk of an upserted row
+        keep: List[int] = []
+        vs_ids: List[str] = []
+        vs_metas: List[Dict[str, Any]] = []
+        vs_texts: List[str] = []
+        row_ids_for_vs: List[int] = []
+        vec_ids_for_db_update: List[str] = []
+        row_checksums_for_vs: List[str] = []
+        seen_rows: Set[int] = set()
+
+        for i, (chk, idx, chunk_text) in enumerate(chunks):
+            row_id = chk_to_dbid.get(chk)
+            if row_id is None:
                 continue
+            keep.append(i)
+            vs_ids.append(f"CSVRow:{row_id}:{idx}")
+            vs_metas.append({"row_id": row_id, "row_checksum": chk, "chunk_index": idx})
+            vs_texts.append(chunk_text)
+
+            if row_id not in seen_rows:
+                seen_rows.add(row_id)
+                row_ids_for_vs.append(row_id)
+                vec_ids_for_db_update.append(f"CSVRow:{row_id}")
+                row_checksums_for_vs.append(chk)
+
+        if not vs_ids:
+            return use_copy
+
+        if error is not None:
+            # rows are keyed by their row checksum; chunk texts never match it
+            await self.repo.mark_checksums_failed(session, row_checksums_for_vs, error)
+            return use_copy
+
+        pending.ids.extend(vs_ids)
+        pending.embs.append(embs[keep])
+        pending.metas.extend(vs_metas)
+        pending.texts.extend(vs_texts)
+        pending.row_ids.extend(row_ids_for_vs)
+        pending.vec_ids.extend(vec_ids_for_db_update)
+        pending.row_checksums.extend(row_checksums_for_vs)
+        if updated:
+            pending.updated_row_ids.extend(r for r in row_ids_for_vs if r in updated)
+        return use_copy
+
+    async def _flush_pending(
+        self, session: AsyncSession, file_id: int, pending: _PendingVectors
+    ):
+        """Write staged vectors in one vector-store call while marking rows done, then commit."""
+        if pending.last_row_index is None:
+            return
 
-            # 4) Persist to vector store (LangChain will embed internally)
+        if pending.ids:
+            # 3) Persist precomputed vectors to the vector store while
+            # 4) rows are marked done (CSVRow.vector_id = 'CSVRow:<row_id>') in a
+            #    savepoint that is rolled back if the store write fails
+            vs_write = asyncio.ensure_future(
+                self._adapter_for(file_id).add_embeddings(
+                    pending.ids, np.concatenate(pending.embs), pending.metas, pending.texts
+                )
+            )
+            savepoint = await session.begin_nested()
             try:
-                await self.vs_adapter.add_documents(vs_docs, ids=vs_ids)
+                await self.repo.mark_rows_done_with_vector(
+                    session, pending.row_ids, pending.vec_ids
+                )
             except Exception as e:
-                failed_checksums = [self._chunk_checksum(d.page_content) for d in vs_docs]
-                await self.repo.mark_checksums_failed(session, failed_checksums, str(e))
-                logger.exception("Vector store persistence failed for file_id=%s: %s", file_id, e)
-                await self.repo.update_last_row_index(session, file_id, current_row_counter)
-                continue
+                logger.exception("Failed to mark rows done for file_id=%s: %s", file_id, e)
+                await savepoint.rollback()
+                savepoint = None
 
-            # 5) Mark rows done and set parent vector ids in DB (CSVRow.vector_id = 'CSVRow:<row_id>')
             try:
-                await self.repo.mark_rows_done_with_vector(session, row_ids_for_vs, vec_ids_for_db_update)
+                await vs_write
             except Exception as e:
-                logger.exception("Failed to mark rows done for file_id=%s: %s", file_id, e)
+                logger.exception("Vector store persistence failed for file_id=%s: %s", file_id, e)
+                if savepoint is not None:
+                    await savepoint.rollback()
+                await self.repo.mark_checksums_failed(session, pending.row_checksums, str(e))
+                await self._finish_batch(session, file_id, pending.last_row_index)
+                return
 
-            await self.repo.update_last_row_index(session, file_id, current_row_counter)
+            if savepoint is not None:
+                await savepoint.commit()
+                self._vec_cache.update(zip(pending.row_checksums, pending.vec_ids))
 
-        logger.info("Completed ingest_rows for file_id=%s", file_meta.get("id"))
+            if pending.updated_row_ids:
+                # a changed row may now split into fewer chunks than before
+                try:
+                    await self._adapter_for(file_id).delete_stale_chunks(
+                        pending.updated_row_ids, pending.ids
+                    )
+                except Exception as e:
+                    logger.warning("Stale chunk cleanup failed for file_id=%s: %s", file_id, e)
+
+        await self._finish_batch(session, file_id, pending.last_row_index)
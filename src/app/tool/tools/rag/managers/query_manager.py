@@ -1,5 +1,8 @@
-from typing import List, Dict, Any, Optional, TypeVar
+from typing import List, Dict, Any, Optional, Tuple, TypeVar
 import asyncio
+import heapq
+import orjson
+from cachetools import LRUCache
 from langchain.schema import Document
 from src.config.logger import logging
 from src.base.vector_store import VectorStoreBase
@@ -17,12 +20,16 @@ class CSVQueryManager:
     """
     CSVQueryManager (query → embed → vs → db)
     Uses vectorstore retriever when available, falls back to vector-by-vector search + DB join.
+    Sharded stores (one collection per file) are searched per file, or fanned
+    out across every shard and merged by distance.
     """
 
     def __init__(self, vector_store: V):
         self.db: Database = global_db
         self.vs = vector_store
         self.retriever = self._init_retriever()
+        # (store, top_k, filter) -> retriever; building one re-wraps the collection
+        self._retrievers: LRUCache = LRUCache(maxsize=128)
 
     def _init_retriever(self) -> Optional[object]:
         """Try to initialize a default retriever."""
@@ -42,15 +49,80 @@ class CSVQueryManager:
         emb = await asyncio.to_thread(get_embeddings().embed_query, query)
         return emb
 
+    def _retriever_for(self, vs: Any, top_k: int, filter: Optional[Dict[str, Any]]):
+        # filters can nest ($and/$or lists), so key on their canonical JSON
+        key = (id(vs), top_k, orjson.dumps(filter, option=orjson.OPT_SORT_KEYS))
+        retriever = self._retrievers.get(key)
+        if retriever is None:
+            retriever = self._retrievers[key] = vs.as_retriever(k=top_k, filter=filter)
+        return retriever
+
+    def _stores(
+        self, file_id: Optional[int], filter: Optional[Dict[str, Any]]
+    ) -> List[Tuple[Any, Optional[Dict[str, Any]]]]:
+        """
+        (collection, filter) pairs to search: the file's shard (none if the file
+        has no vectors yet), or with no file every shard plus the unsharded
+        collection. Pre-sharding vectors are moved into shards at initialize.
+        """
+        shard_keys = getattr(self.vs, "shard_keys", None)
+        if not callable(shard_keys):
+            return [(self.vs, filter)]
+        keys = shard_keys()
+        if file_id is not None:
+            key = f"file_{file_id}"
+            return [(self.vs.shard(key), filter)] if key in keys else []
+        return [(self.vs, filter)] + [(self.vs.shard(k), filter) for k in sorted(keys)]
+
+    async def _vector_search(
+        self,
+        stores: List[Tuple[Any, Optional[Dict[str, Any]]]],
+        emb: List[float],
+        top_k: int,
+    ) -> List[Tuple[Document, float]]:
+        """Search every store concurrently; keep the top_k smallest distances."""
+        per_store = await asyncio.gather(
+            *(
+                asyncio.to_thread(
+                    vs.similarity_search_by_vector_with_score,
+                    query_vector=emb,
+                    k=top_k,
+                    filter=flt,
+                )
+                for vs, flt in stores
+            )
+        )
+        if len(per_store) == 1:
+            return per_store[0]
+        return heapq.nsmallest(top_k, (r for rs in per_store for r in rs), key=lambda r: r[1])
+
+    @staticmethod
+    def _row_result(r: Dict[str, Any], score: float) -> Dict[str, Any]:
+        return {
+            "id": r.get("id"),
+            "external_id": r.get("external_id"),
+            "content": r.get("content"),
+            "fields": r.get("fields"),
+            "score": score,
+        }
+
     async def search(
-        self, query: str, top_k: int = 5, filter: Optional[Dict[str, Any]] = None
+        self,
+        query: str,
+        top_k: int = 5,
+        filter: Optional[Dict[str, Any]] = None,
+        file_id: Optional[int] = None,
     ) -> List[Dict[str, Any]]:
         """Query vector store (retriever if available), fallback to vector search + DB join."""
         docs: List[Document] = []
+        stores = self._stores(file_id, filter)
+        if not stores:
+            return []
+        vs, vs_filter = stores[0]
 
-        if hasattr(self.vs, "as_retriever") and callable(self.vs.as_retriever):
+        if len(stores) == 1 and hasattr(vs, "as_retriever") and callable(vs.as_retriever):
             try:
-                retriever = self.vs.as_retriever(k=top_k, filter=filter)
+                retriever = self._retriever_for(vs, top_k, vs_filter)
                 aget = getattr(retriever, "ainvoke", None)
                 get_docs = getattr(retriever, "get_relevant_documents", None)
                 if callable(aget):
@@ -79,48 +151,42 @@ class CSVQueryManager:
         try:
             emb = await self._embed_query(query)
 
-            results = self.vs.similarity_search_by_vector_with_score(
-                query_vector=emb, k=top_k, filter=filter
-            )
+            results = await self._vector_search(stores, emb, top_k)
 
-            vector_ids = []
-            scores = []
+            parent_ids: List[str] = []
+            scores: List[float] = []
             for doc, score in results:
-                m = doc.metadata or {}
-                row_id = m.get("row_id")
+                row_id = (doc.metadata or {}).get("row_id")
                 if row_id is not None:
-                    vector_ids.append(f"CSVRow:{int(row_id)}:0")
+                    parent_ids.append(f"CSVRow:{int(row_id)}")
                     scores.append(float(score))
 
-            parent_ids = [vid.split(":", 2)[:2] for vid in vector_ids]
-            parent_ids = [":".join(parts) for parts in parent_ids]
+            if not parent_ids:
+                return []
 
-            unique_parent_ids = []
-            seen = set()
-            for p in parent_ids:
-                if p not in seen:
-                    seen.add(p)
-                    unique_parent_ids.append(p)
+            if len(parent_ids) == 1:
+                # single hit (e.g. top_k == 1): no dedup or id -> row map needed
+                async with self.db.session() as session:
+                    rows = await select_rows_by_vector_ids(session, parent_ids)
+                if not rows:
+                    logger.warning("No DB row found for vector_id=%s", parent_ids[0])
+                    return []
+                return [self._row_result(rows[0], scores[0])]
 
+            # one SELECT ... WHERE vector_id = ANY(...) regardless of top_k
             async with self.db.session() as session:
-                rows = await select_rows_by_vector_ids(session, unique_parent_ids)
+                rows = await select_rows_by_vector_ids(
+                    session, list(dict.fromkeys(parent_ids))
+                )
 
             id_to_row = {r.get("vector_id"): r for r in rows}
             out = []
-            for i, parent_vec_id in enumerate(parent_ids):
+            for parent_vec_id, score in zip(parent_ids, scores):
                 r = id_to_row.get(parent_vec_id)
                 if not r:
                     logger.warning("No DB row found for vector_id=%s", parent_vec_id)
                     continue
-                out.append(
-                    {
-                        "id": r.get("id"),
-                        "external_id": r.get("external_id"),
-                        "content": r.get("content"),
-                        "fields": r.get("fields"),
-                        "score": scores[i] if i < len(scores) else None,
-                    }
-                )
+                out.append(self._row_result(r, score))
             return out
 
         except Exception as e:
@@ -1,5 +1,5 @@
 import asyncio
-from typing import Optional, Any, Dict, List
+from typing import Optional, Any, Dict, List, Tuple
 import logging
 
 from src.config import Database, db as global_db
@@ -7,6 +7,7 @@ from src.config import Database, db as global_db
 from src.app.tool.tools.rag.crud.crud_tool import (
     get_all_tools,
     get_tool_registry,
+    try_lock_and_get_tool_registry,
     set_tool_enable_status,
     create_tool_registry,
     change_tool_adapter,
@@ -93,6 +94,29 @@ class ToolRegistryManager:
             f"Tool '{tool_name}' not found. It will be created after ingestion.",
         )
 
+    async def lock_and_get_tool(
+        self,
+        session,
+        lock_key: int,
+        tool_name: str,
+        retries: int = 3,
+        delay: float = 0.1,
+    ) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        """
+        Try the session-level advisory lock and read tool_name's registry entry
+        in the same round trip, retrying the lock up to `retries` times.
+        Returns (acquired, tool_dict or None); the caller must release the lock.
+        """
+        attempt = 0
+        while True:
+            acquired, tool = await try_lock_and_get_tool_registry(
+                session, lock_key, tool_name
+            )
+            if acquired or attempt >= retries:
+                return acquired, tool
+            attempt += 1
+            await asyncio.sleep(delay)
+
     async def initialize_tool(
         self, session, tool_name: str, file_id: Optional[int] = None
     ) -> Dict[str, Any]:
@@ -1,13 +1,67 @@
 from gc import enable
 from src.base.models import BaseModel
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import Integer, String, Text, JSON, ForeignKey, Boolean
+from sqlalchemy import BigInteger, Integer, String, Text, ForeignKey, Boolean, Index, UniqueConstraint
+from sqlalchemy.dialects.postgresql import JSONB
+from operator import attrgetter
 from typing import Optional
 from src.enum.csv_status import EmbeddingStatus, FileStatus
 from src.enum.executor import Executor
 
+# to_dict fields; one attrgetter call fetches them all as a tuple
+_ROW_KEYS = (
+    "id",
+    "external_id",
+    "file_id",
+    "embedding_status",
+    "vector_id",
+    "checksum",
+    "content",
+    "fields",
+    "embedding_error",
+    "created_at",
+    "updated_at",
+)
+_row_values = attrgetter(*_ROW_KEYS)
+_FILE_KEYS = (
+    "id",
+    "status",
+    "path",
+    "last_row_index",
+    "checksum",
+    "mtime_ns",
+    "size",
+    "created_at",
+    "updated_at",
+)
+_file_values = attrgetter(*_FILE_KEYS)
+_TOOL_KEYS = (
+    "id",
+    "name",
+    "type",
+    "adapter",
+    "file_id",
+    "enabled",
+    "created_at",
+    "updated_at",
+)
+_tool_values = attrgetter(*_TOOL_KEYS)
+
+
 class CSVRow(BaseModel):
     __tablename__ = "csv_rows"
+    __table_args__ = (
+        # upsert conflict target; cheaper to maintain than a unique 64-char checksum
+        UniqueConstraint("file_id", "external_id", name="uq_csv_rows_file_id_external_id"),
+        # jsonb_path_ops GIN serves fields @> {...} containment filters
+        Index(
+            "csv_rows_fields_gin",
+            "fields",
+            postgresql_using="gin",
+            postgresql_ops={"fields": "jsonb_path_ops"},
+        ),
+    )
+
     external_id: Mapped[int] = mapped_column(Integer, index=True, nullable=False)
 
     file_id: Mapped[int] = mapped_column(
@@ -19,30 +73,18 @@ class CSVRow(BaseModel):
         nullable=False,
         default=EmbeddingStatus.PENDING.value,
     )
-    vector_id: Mapped[Optional[str]] = mapped_column(String(128), nullable=True)
+    # search joins vector-store hits back to rows by vector_id
+    vector_id: Mapped[Optional[str]] = mapped_column(String(128), index=True, nullable=True)
     embedding_error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     content: Mapped[str] = mapped_column(Text, nullable=False)
-    checksum: Mapped[str] = mapped_column(
-        String(64), unique=True, index=True, nullable=False
-    )
-    fields: Mapped[dict] = mapped_column(JSON, nullable=True)
+    # xxh3-128 hex digest (see row_checksum)
+    checksum: Mapped[str] = mapped_column(String(32), index=True, nullable=False)
+    fields: Mapped[dict] = mapped_column(JSONB, nullable=True)
 
     file = relationship("CSVFile", back_populates="rows")
 
     def to_dict(self):
-        return {
-            "id": self.id,
-            "external_id": self.external_id,
-            "file_id": self.file_id,
-            "embedding_status": self.embedding_status,
-            "vector_id": self.vector_id,
-            "checksum": self.checksum,
-            "content": self.content,
-            "fields": self.fields,
-            "embedding_error": self.embedding_error,
-            "created_at": self.created_at,
-            "updated_at": self.updated_at,
-        }
+        return dict(zip(_ROW_KEYS, _row_values(self)))
 
 
 class CSVFile(BaseModel):
@@ -56,19 +98,14 @@ class CSVFile(BaseModel):
         default=FileStatus.PENDING.value,
     )
     last_row_index: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    # stat() snapshot at the last checksum; a match lets a rescan skip hashing the file
+    mtime_ns: Mapped[Optional[int]] = mapped_column(BigInteger, nullable=True)
+    size: Mapped[Optional[int]] = mapped_column(BigInteger, nullable=True)
 
     rows = relationship("CSVRow", back_populates="file", cascade="all, delete-orphan")
 
     def to_dict(self):
-        return {
-            "id": self.id,
-            "status": self.status,
-            "path": self.path,
-            "last_row_index": self.last_row_index,
-            "checksum": self.checksum,
-            "created_at": self.created_at,
-            "updated_at": self.updated_at,
-        }
+        return dict(zip(_FILE_KEYS, _file_values(self)))
 
 class ToolRegistry(BaseModel):
     __tablename__ = "tool_registry"
@@ -83,13 +120,4 @@ class ToolRegistry(BaseModel):
     file = relationship("CSVFile", backref="tool_entry")
     
     def to_dict(self):
-        return {
-            "id": self.id,
-            "name": self.name,
-            "type": self.type,
-            "adapter": self.adapter,
-            "file_id": self.file_id,
-            "enabled": self.enabled,
-            "created_at": self.created_at,
-            "updated_at": self.updated_at,
-        }
+        return dict(zip(_TOOL_KEYS, _tool_values(self)))
@@ -1,10 +1,11 @@
+from functools import lru_cache
 from pathlib import Path
-import aiofiles
-import json
+import orjson
 from typing import TypeVar
 from src.config.logger import logging
 from src.base.base_tool import BaseTool
-from src.helpers.pg_lock import advisory_lock
+import asyncio
+from src.helpers.pg_lock import advisory_lock, advisory_unlock, listen, notify
 
 from src.app.tool.tools.rag.managers.file_manager import CSVFileManager
 from src.app.tool.tools.rag.managers.ingest_manager import CSVIngestManager
@@ -12,6 +13,8 @@ from src.app.tool.tools.rag.managers.query_manager import CSVQueryManager
 from src.app.tool.tools.rag.managers.tool_registry import ToolRegistryManager
 from src.app.tool.tools.rag.loader import CSVLoader
 from src.config import db as global_db, Database
+from src.config.settings import settings
+from src.services.embedding import shutdown_remote_embedder
 from src.base.vector_store import VectorStoreBase
 from src.enum.csv_status import FileStatus
 from .schemas import RagArgs
@@ -20,6 +23,17 @@ logger = logging.getLogger(__name__)
 
 V=TypeVar("V", bound=VectorStoreBase)
 
+# the initialize() lock holder notifies this channel (payload: tool name) once done
+_READY_CHANNEL = "csv_rag_ready"
+_READY_TIMEOUT = 60.0
+
+
+@lru_cache(maxsize=1)
+def _load_meta_map() -> dict:
+    # shared by every subtool; parsed once per process (a missing file raises and isn't cached)
+    return orjson.loads(Path("static/csv/csv_description.json").read_bytes())
+
+
 class CsvRagTool(BaseTool):
     """
     Tool for CSV Retrieval-Augmented Generation (RAG).
@@ -38,6 +52,8 @@ class CsvRagTool(BaseTool):
         self.query_mgr: CSVQueryManager = CSVQueryManager(vector_store)
         self.registry_mgr: ToolRegistryManager = ToolRegistryManager()
         self._ready = False
+        # set for per-file subtools; queries then hit only that file's shard
+        self._file_id = None
         self._description = "General RAG"
         self._name = name
 
@@ -62,57 +78,79 @@ class CsvRagTool(BaseTool):
         Initialization phase.
         Now integrates ToolRegistry validation.
         Still acquires an advisory lock to avoid duplicate ingestion races.
+        A process that loses the lock waits on csv_rag_ready: a NOTIFY carrying
+        its own tool name means it is ready, any other one means the lock was
+        just released and is tried again.
         """
 
         async with self.db.session() as session:
-            valid, tool_or_msg = await self.registry_mgr.validate_and_prepare_tool(
-                session, self.name
-            )
-            if not valid:
-                logger.warning(
-                    f"Tool {self.name} not found. Creating it automatically."
-                )
-                tool_or_msg = await self.registry_mgr.create_tool(
-                    session,
-                    name=self.name,
-                    description="Global CSV RAG root tool",
-                    file_id=None,
+            lock_key = 1000
+
+            # listen before trying the lock so the holder's NOTIFY cannot slip past
+            async with listen(self.db.engine, _READY_CHANNEL) as notices:
+                # the lock attempt and the registry lookup share one round trip
+                acquired, tool = await self.registry_mgr.lock_and_get_tool(
+                    session, lock_key, self.name, retries=5, delay=0.1
                 )
-                valid = True
-
-            tool = tool_or_msg
-            # async with self.db.session() as session:
-            #     tool = await self.registry_mgr.get_tool(session, self.name)
-            #     if not tool:
-            #         tool = await self.registry_mgr.create_tool(
-            #             session,
-            #             name=self.name,
-            #             description="Global CSV RAG root tool",
-            #             file_id=None,
-            #         )
+                if tool is None:
+                    logger.warning(
+                        f"Tool {self.name} not found. Creating it automatically."
+                    )
+                    tool = await self.registry_mgr.create_tool(
+                        session,
+                        name=self.name,
+                        description="Global CSV RAG root tool",
+                        file_id=None,
+                    )
+                self._file_id = tool.get("file_id")
 
-            lock_key = 1000
-            
-            async with advisory_lock(
-                session, lock_key, wait=False, retries=5, delay=0.1
-            ) as acquired:
-                if not acquired:
+                loop = asyncio.get_running_loop()
+                deadline = loop.time() + _READY_TIMEOUT
+                while not acquired:
                     logger.info(
-                        f"CsvRagTool initialize: another process holds the lock (tool={tool.get("name")}). Proceeding (ready)."
+                        f"CsvRagTool initialize: another process holds the lock (tool={tool.get("name")}), waiting for it."
                     )
-                else:
-                    await self.registry_mgr.initialize_tool(
-                        session, tool.get("name"), tool.get("file_id")
+                    try:
+                        payload = await asyncio.wait_for(
+                            notices.get(), timeout=max(0.0, deadline - loop.time())
+                        )
+                    except asyncio.TimeoutError:
+                        logger.warning(
+                            "CsvRagTool initialize: no ready signal for %s after %ss, proceeding.",
+                            tool.get("name"),
+                            _READY_TIMEOUT,
+                        )
+                        break
+                    if payload == tool.get("name"):
+                        break
+                    # the holder finished another tool and released the lock; take it
+                    acquired, _ = await self.registry_mgr.lock_and_get_tool(
+                        session, lock_key, self.name, retries=0
                     )
+
+                if acquired:
+                    try:
+                        # one-time: per-file queries read only the file's shard
+                        await self.ingest_mgr.shard_legacy_vectors(session)
+                        await self.registry_mgr.initialize_tool(
+                            session, tool.get("name"), tool.get("file_id")
+                        )
+                        await notify(session, _READY_CHANNEL, tool.get("name"))
+                    finally:
+                        # unlock before commit: the NOTIFY goes out at commit, so
+                        # waiters it wakes find the lock already free
+                        await advisory_unlock(session, lock_key)
+                    await session.commit()
                     logger.info(
                         f"CsvRagTool initialize: acquired lock and validated tool '{tool.get("name")}'."
                     )
-                    self._ready = True
+                self._ready = True
 
     async def ingest_folder(self, folder_path: str, batch_size: int = 512):
         """
         Scan a folder and ingest new/changed CSVs into the vector store.
         Protected by an advisory lock to avoid concurrent ingestion.
+        Up to INGEST_FILE_CONCURRENCY files are ingested at once, each on its own session.
         Heavy ingestion should be delegated to Celery (if used in production).
         """
         if not self._ready:
@@ -121,59 +159,85 @@ class CsvRagTool(BaseTool):
 
         lock_key = 42
         async with self.db.session() as session:
-            async with advisory_lock(session, lock_key) as acquired:
+            # fail fast: a concurrent ingest already owns the folder; hold the
+            # lock for the whole scan so the work below is actually serialized
+            async with advisory_lock(session, lock_key, retries=0) as acquired:
                 if not acquired:
                     logger.info(
                         "ingest_folder: another process holds lock, skipping ingestion."
                     )
                     return
 
-            file_paths = await self.file_mgr.scan_folder(folder_path)
-            for p in file_paths:
-                file_meta = await self.file_mgr.get_or_register_file(
-                    session, p
-                )
+                file_paths = await self.file_mgr.scan_folder(folder_path)
+                # files are independent; the lock above still serializes whole scans.
+                # _ingest_file handles its own failures, so one file never cancels the rest
+                sem = asyncio.Semaphore(max(1, settings.ingest_file_concurrency))
 
-                status = file_meta.get("status")
-                if status == FileStatus.DONE.value:
-                    logger.info("Skipping already ingested file: %s", p)
-                    continue
+                async def _bounded(p: str):
+                    async with sem:
+                        await self._ingest_file(p, batch_size)
 
-                file_stem = Path(file_meta["path"]).stem
-                subtool_name = f"{self.name}:{file_stem}"
+                async with asyncio.TaskGroup() as tg:
+                    for p in file_paths:
+                        tg.create_task(_bounded(p))
 
-                if status in [
-                    FileStatus.PENDING.value,
-                    FileStatus.FAILED.value,
-                ]:
-                    logger.info(f"Processing pending or failed file {p}")
-                    try:
-                        await self.ingest_mgr.ingest_rows(
-                            session,
-                            CSVLoader.stream_csv_async(p),
-                            batch_size=batch_size,
-                            file_meta=file_meta,
-                        )
-                        await self.file_mgr.mark_file_as_done(
-                            session, file_meta
-                        )
+    async def _ingest_file(self, p: str, batch_size: int):
+        """
+        Register and ingest one CSV on its own session (connection).
+        Errors are logged here; the session scope discards whatever the failed
+        attempt left uncommitted.
+        """
+        async with self.db.session() as session:
+            try:
+                file_meta = await self.file_mgr.get_or_register_file(session, p)
+            except Exception as e:
+                logger.error("ingest_folder: failed to register %s: %s", p, e)
+                return
 
-                        await self.registry_mgr.create_tool(
-                            session,
-                            name=f"{self.name}:{Path(file_meta.get('path')).stem}",
-                            file_id=file_meta.get("id"),
-                        )
+            status = file_meta.get("status")
+            if status == FileStatus.DONE.value:
+                logger.info("Skipping already ingested file: %s", p)
+                return
 
-                        logger.info(f"Registered new subtool: {subtool_name}")
+            if status not in [
+                FileStatus.PENDING.value,
+                FileStatus.FAILED.value,
+            ]:
+                logger.info("Skipping unchanged file: %s", p)
+                return
 
-                    except Exception as e:
-                        await self.file_mgr.mark_file_as_failed(
-                            session, file_meta
-                        )
-                        logger.error("Ingestion failed for file %s: %s", p, e)
-                        await session.rollback()
-                else:
-                    logger.info("Skipping unchanged file: %s", p)
+            subtool_name = f"{self.name}:{Path(file_meta['path']).stem}"
+            logger.info(f"Processing pending or failed file {p}")
+            try:
+                await self.ingest_mgr.ingest_frames(
+                    session,
+                    CSVLoader.stream_frames_async(
+                        p,
+                        chunksize=settings.ingest_read_chunk_rows,
+                        skip_rows=file_meta.get("last_row_index") or 0,
+                    ),
+                    batch_size=batch_size,
+                    file_meta=file_meta,
+                    source_at_resume=True,
+                )
+                await self.file_mgr.mark_file_as_done(session, file_meta)
+
+                await self.registry_mgr.create_tool(
+                    session,
+                    name=subtool_name,
+                    file_id=file_meta.get("id"),
+                )
+
+                logger.info(f"Registered new subtool: {subtool_name}")
+
+            except Exception as e:
+                logger.error("Ingestion failed for file %s: %s", p, e)
+                # the failed transaction must be cleared before the status update can run
+                await session.rollback()
+                try:
+                    await self.file_mgr.mark_file_as_failed(session, file_meta)
+                except Exception:
+                    logger.exception("Could not mark %s as failed", p)
 
     async def run(self, args: dict):
         """
@@ -184,20 +248,23 @@ class CsvRagTool(BaseTool):
             return {"error": "Tool not initialized."}
 
         try:
-            parsed = RagArgs(**args)
-            res = await self.query_mgr.search(parsed.query, parsed.top_k)
+            parsed = RagArgs.model_validate(args)
+            res = await self.query_mgr.search(
+                parsed.query, parsed.top_k, file_id=self._file_id
+            )
             return {"result": res}
         except Exception as e:
             logger.exception("CsvRagTool run failed")
             return {"error": str(e)}
 
+    async def shutdown(self) -> None:
+        # the embedding-server client is shared by every subtool; closing it twice is a no-op
+        await shutdown_remote_embedder()
+
     async def set_metadata_from_json(self) -> None:
         try:
-            async with aiofiles.open(
-                "static/csv/csv_description.json", "r", encoding="utf_8"
-            ) as f:
-                content = await f.read()
-                meta_map: dict = json.loads(content)
+            # one threaded read beats aiofiles' per-syscall executor hops for a small file
+            meta_map: dict = await asyncio.to_thread(_load_meta_map)
         except FileNotFoundError:
             logger.warning("csv_description.json not found. Skipping metadata update.")
             return
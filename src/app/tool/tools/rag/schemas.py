@@ -1,6 +1,9 @@
 from typing import (
     Dict,
     Any,
+    Iterable,
+    List,
+    NotRequired,
     TypedDict,
 )
 from pydantic import BaseModel
@@ -28,16 +31,44 @@ class RowMeta(TypedDict):
 
 class IncomingRow(TypedDict):
     metadata: RowMeta
+    checksum: NotRequired[str]
 
 
-class PreparedRow(TypedDict):
-    file_id: int
-    external_id: int
-    content: str
-    checksum: str
-    fields: Dict[str, Any]
+class RowBatch:
+    """
+    Prepared csv_rows for one file, stored column-wise: one list per field
+    instead of one dict per row. zip(*columns) feeds COPY directly.
+    """
+
+    __slots__ = ("file_id", "external_ids", "contents", "checksums", "fields")
+
+    def __init__(self, file_id: int):
+        self.file_id = file_id
+        self.external_ids: List[int] = []
+        self.contents: List[str] = []
+        self.checksums: List[str] = []
+        self.fields: List[Dict[str, Any]] = []
+
+    def __len__(self) -> int:
+        return len(self.checksums)
+
+    def append(self, external_id: int, content: str, checksum: str, fields: Dict[str, Any]):
+        self.external_ids.append(external_id)
+        self.contents.append(content)
+        self.checksums.append(checksum)
+        self.fields.append(fields)
+
+    def take(self, indices: Iterable[int]) -> "RowBatch":
+        """New batch holding only the rows at `indices`, in that order."""
+        out = RowBatch(self.file_id)
+        for i in indices:
+            out.append(self.external_ids[i], self.contents[i], self.checksums[i], self.fields[i])
+        return out
 
 
 class FileMeta(TypedDict):
     id: int
+    status: str
     last_row_index: int
+    # set by get_or_register_file only when this call created the record
+    new: NotRequired[bool]
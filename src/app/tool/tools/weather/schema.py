@@ -1,3 +1,4 @@
+from dataclasses import dataclass
 from pydantic import BaseModel
 from datetime import datetime
 
@@ -6,7 +7,10 @@ class WeatherArgs(BaseModel):
     city: str
 
 
-class WeatherExtract(BaseModel):
+@dataclass(slots=True)
+class WeatherExtract:
+    """Built once per API response from trusted fields; no per-call validation."""
+
     city: str
     country: str
     temp_c: float
@@ -15,17 +19,29 @@ class WeatherExtract(BaseModel):
     feelslike_c: float
     wind_kph: float
 
+    def model_dump(self) -> dict:
+        return {
+            "city": self.city,
+            "country": self.country,
+            "temp_c": self.temp_c,
+            "localtime": self.localtime,
+            "humidity": self.humidity,
+            "feelslike_c": self.feelslike_c,
+            "wind_kph": self.wind_kph,
+        }
+
 
 def parse_weather(api_response: dict) -> WeatherExtract:
     """
     Based on OpenWeather response
     """
+    main = api_response["main"]
     return WeatherExtract(
-        city=api_response["name"],
-        country=api_response["sys"]["country"],
-        temp_c=api_response["main"]["temp"],
+        city=str(api_response["name"]),
+        country=str(api_response["sys"]["country"]),
+        temp_c=float(main["temp"]),
         localtime=datetime.fromtimestamp(api_response["dt"]),
-        humidity=api_response["main"]["humidity"],
-        feelslike_c=api_response["main"]["feels_like"],
-        wind_kph=api_response["wind"]["speed"] * 3.6,
+        humidity=float(main["humidity"]),
+        feelslike_c=float(main["feels_like"]),
+        wind_kph=float(api_response["wind"]["speed"]) * 3.6,
     )
@@ -1,5 +1,10 @@
-import json
+import asyncio
+import time
+import unicodedata
+from collections import Counter, defaultdict
+import aiofiles
 import aiohttp
+import orjson
 from rapidfuzz import process, fuzz
 from pathlib import Path
 
@@ -11,14 +16,51 @@ from . import cities_path
 
 logger = logging.getLogger(__name__)
 
+# fuzzy matching only scores the cities sharing the most trigrams with the input
+_MAX_CANDIDATES = 50
+
+
+def _normalize(name: str) -> str:
+    """Lowercase and strip diacritics ("Tabríz" -> "tabriz")."""
+    decomposed = unicodedata.normalize("NFKD", name)
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch)).lower()
+
+
+def _trigrams(text: str) -> set:
+    padded = f"  {text} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+def _extract_city(query: str, choices):
+    """
+    Best (name, score, key) in `choices`, or None. Plain ratio catches typos
+    of the whole name; partial_ratio then handles truncated input. Both are
+    far cheaper than WRatio, which runs four scorers per comparison.
+    score_cutoff lets the C scorer skip candidates early; input is already lowercased.
+    """
+    return process.extractOne(
+        query, choices, scorer=fuzz.ratio, score_cutoff=85
+    ) or process.extractOne(query, choices, scorer=fuzz.partial_ratio, score_cutoff=70)
+
 
 class WeatherTool(BaseTool):
     def __init__(self, cities_path: str = None) -> None:
         self.api_key = settings.weather_api_key
         self.base_url = settings.weather_url
         self.cities_path = cities_path
-        self.cities = []
-        self.name_to_city = {}
+        # cities as parallel arrays: fuzzy matching scans the flat name list, hits index _infos
+        self._names = []
+        self._names_lower = []
+        self._infos = []
+        self._index_by_lower = {}
+        self._index_by_norm = {}
+        self._trigram_index = defaultdict(set)
+        self._session = None
+        self._session_loop = None
+        # normalized city name -> (fetched_at, payload); one lock per key coalesces concurrent misses
+        self._cache = {}
+        self._cache_ttl = settings.weather_cache_ttl
+        self._cache_locks = defaultdict(asyncio.Lock)
         self._ready = False
 
     @property
@@ -39,60 +81,140 @@ class WeatherTool(BaseTool):
             self._ready = True
             return
 
-        with open(path, "r", encoding="utf-8") as f:
-            self.cities = json.load(f)
-
-        self.name_to_city = {c["name"].lower(): c for c in self.cities}
+        async with aiofiles.open(path, "rb") as f:
+            self._infos = orjson.loads(await f.read())
+
+        self._names = [c["name"] for c in self._infos]
+        self._names_lower = [name.lower() for name in self._names]
+        for i, name in enumerate(self._names_lower):
+            normalized = _normalize(name)
+            self._index_by_lower[name] = i
+            self._index_by_norm[normalized] = i
+            for gram in _trigrams(normalized):
+                self._trigram_index[gram].add(i)
         self._ready = True
-        logger.info("WeatherTool initialized with %d cities", len(self.cities))
+        logger.info("WeatherTool initialized with %d cities", len(self._infos))
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        # keep-alive pool reused across calls; sessions are bound to the loop that created them
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            self._retire_session()
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=100, ttl_dns_cache=300, keepalive_timeout=60
+                )
+            )
+            self._session_loop = loop
+        return self._session
+
+    def _retire_session(self) -> None:
+        """Release a session left behind by another event loop."""
+        session, loop = self._session, self._session_loop
+        self._session = self._session_loop = None
+        if session is None or session.closed:
+            return
+        if loop is not None and not loop.is_closed():
+            # its connections belong to that loop, so close it there
+            asyncio.run_coroutine_threadsafe(session.close(), loop)
+        else:
+            # the loop is gone (e.g. one asyncio.run per worker task), so its
+            # transports cannot be closed through it; detach so the pool is dropped
+            session.detach()
+
+    async def shutdown(self) -> None:
+        if self._session is not None and not self._session.closed:
+            if self._session_loop is asyncio.get_running_loop():
+                await self._session.close()
+            else:
+                self._retire_session()
+        self._session = self._session_loop = None
+
+    def _candidates(self, normalized: str) -> list:
+        """Indices of the cities sharing the most trigrams with the input."""
+        hits = Counter()
+        for gram in _trigrams(normalized):
+            hits.update(self._trigram_index.get(gram, ()))
+        return [i for i, _ in hits.most_common(_MAX_CANDIDATES)]
 
     def _guess_city(self, user_input: str):
-        city_names = [c["name"] for c in self.cities]
-        result = process.extractOne(user_input, city_names, scorer=fuzz.WRatio)
+        normalized = _normalize(user_input)
+        idx = self._index_by_norm.get(normalized)
+        if idx is not None:
+            return self._infos[idx]
+
+        candidates = {i: self._names_lower[i] for i in self._candidates(normalized)}
+        result = _extract_city(user_input, candidates)
+        if not result:
+            # trigram pre-filter can miss partial matches; fall back to a full scan
+            result = _extract_city(user_input, self._names_lower)
         if not result:
             logger.warning(f"No fuzzy match found for '{user_input}'")
             return None
-        if len(result) == 2:
-            best_match, score = result
-        else:
-            best_match, score, _ = result
+        best_match, score, idx = result
 
         logger.info(f"Fuzzy match for '{user_input}' -> '{best_match}' (score={score})")
-        return self.name_to_city.get(best_match.lower()) if score > 70 else None
+        return self._infos[idx] if score > 70 else None
+
+    def _cached(self, key: str):
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        fetched_at, payload = entry
+        if time.monotonic() - fetched_at >= self._cache_ttl:
+            del self._cache[key]
+            return None
+        # callers get their own copy so the cached payload can't be mutated
+        return dict(payload)
+
+    async def _fetch(self, city_info: dict) -> dict:
+        params = {
+            "q": f"{city_info['name']},ir",
+            "APPID": self.api_key,
+            "units": "metric",
+        }
+
+        async with self._get_session().get(self.base_url, params=params) as resp:
+            text = await resp.text()
+            if resp.status != 200:
+                logger.error("Weather API failed: %s, body=%s", resp.status, text)
+                return {"error": f"Weather API failed: {resp.status}, {text}"}
+
+            try:
+                data = orjson.loads(text)
+            except Exception:
+                logger.exception("Failed to parse weather API response")
+                return {"error": "Invalid response from weather API"}
+
+        return parse_weather(data).model_dump()
 
     async def run(self, args: dict) -> dict:
         try:
-            parsed = WeatherArgs(**args)
+            parsed = WeatherArgs.model_validate(args)
             city = parsed.city.strip()
 
-            city_info = self.name_to_city.get(city.lower()) or self._guess_city(
-                city.lower()
+            idx = self._index_by_lower.get(city.lower())
+            city_info = (
+                self._infos[idx] if idx is not None else self._guess_city(city.lower())
             )
             if not city_info:
                 return {"error": f"City '{city}' not found in index."}
 
-            params = {
-                "q": f"{city_info['name']},ir",
-                "APPID": self.api_key,
-                "units": "metric",
-            }
-
-            async with aiohttp.ClientSession() as session:
-                async with session.get(self.base_url, params=params) as resp:
-                    text = await resp.text()
-                    if resp.status != 200:
-                        logger.error(
-                            "Weather API failed: %s, body=%s", resp.status, text
-                        )
-                        return {"error": f"Weather API failed: {resp.status}, {text}"}
-
-                    try:
-                        data = json.loads(text)
-                    except Exception:
-                        logger.exception("Failed to parse weather API response")
-                        return {"error": "Invalid response from weather API"}
-
-            return parse_weather(data).model_dump()
+            key = _normalize(city_info["name"])
+            cached = self._cached(key)
+            if cached is not None:
+                return cached
+
+            async with self._cache_locks[key]:
+                # another caller may have filled the entry while we waited
+                cached = self._cached(key)
+                if cached is not None:
+                    return cached
+
+                result = await self._fetch(city_info)
+                if "error" not in result:
+                    self._cache[key] = (time.monotonic(), dict(result))
+                return result
 
         except Exception as e:
             logger.exception("WeatherTool failed")
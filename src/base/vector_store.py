@@ -1,6 +1,8 @@
 # base/vector_store.py
 from abc import ABC, abstractmethod
-from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
 from langchain.schema import Document
 
 
@@ -23,10 +25,31 @@ class VectorStoreBase(ABC):
     @abstractmethod
     def add_embeddings(
         self,
-        embeddings: Sequence[Sequence[float]],
+        embeddings: Union[np.ndarray, Sequence[Sequence[float]]],
         metadatas: Optional[Sequence[Dict[str, Any]]] = None,
         ids: Optional[Sequence[str]] = None,
+        documents: Optional[Sequence[str]] = None,
+    ) -> List[str]:
+        ...
+
+    @abstractmethod
+    def add_batch(
+        self,
+        ids: Sequence[str],
+        embeddings: Union[np.ndarray, Sequence[Sequence[float]]],
+        metadatas: Optional[Sequence[Dict[str, Any]]] = None,
+        documents: Optional[Sequence[str]] = None,
+        batch_size: Optional[int] = None,
     ) -> List[str]:
+        """
+        Upsert precomputed vectors with one store call per batch_size slice
+        (default: the largest the backend accepts), never one call per vector.
+        """
+        ...
+
+    @abstractmethod
+    def delete_batch(self, ids: Sequence[str], batch_size: Optional[int] = None) -> None:
+        """Delete by ids with one store call per batch_size slice."""
         ...
 
     @abstractmethod
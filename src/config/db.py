@@ -1,4 +1,5 @@
 import asyncio
+import orjson
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import declarative_base
 from contextlib import asynccontextmanager
@@ -13,9 +14,33 @@ logger = logging.getLogger(__name__)
 Base = declarative_base()
 
 
+def _json_dumps(obj) -> str:
+    # CSVRow.fields is encoded once per ingested row; orjson is far cheaper than stdlib json
+    return orjson.dumps(obj).decode("utf-8")
+
+
 class Database(metaclass=SingletonMeta):
     def __init__(self):
-        self.engine = create_async_engine(settings.database_url, echo=True, future=True)
+        connect_args = {}
+        if "+asyncpg" in settings.database_url:
+            # short OLTP statements never benefit from JIT; tag connections for pg_stat_activity
+            connect_args["server_settings"] = {
+                "application_name": "mcp-server",
+                "jit": "off",
+            }
+
+        self.engine = create_async_engine(
+            settings.database_url,
+            echo=settings.db_echo,
+            future=True,
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_recycle=settings.db_pool_recycle,
+            pool_pre_ping=True,
+            connect_args=connect_args,
+            json_serializer=_json_dumps,
+            json_deserializer=orjson.loads,
+        )
         self.SessionLocal = async_sessionmaker(
             bind=self.engine,
             expire_on_commit=False,
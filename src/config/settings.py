@@ -25,17 +25,54 @@ class Settings(BaseSettings):
     embedding_model: str = os.getenv("EMBEDDING_MODEL", "intfloat/multilingual-e5-base")
     batch_size: int = int(os.getenv("BATCH_SIZE", "64"))
     embedding_batch_size: int = int(os.getenv("EMBEDDING_BATCH_SIZE", "128"))
+    # batches buffered between ingest pipeline stages (stream -> embed -> write)
+    ingest_queue_size: int = int(os.getenv("INGEST_QUEUE_SIZE", "2"))
+    # rows per DataFrame parsed from a CSV; ingest re-batches them for the DB
+    ingest_read_chunk_rows: int = int(os.getenv("INGEST_READ_CHUNK_ROWS", "8192"))
+    # chunk vectors coalesced per vector-store write, and the max wait before flushing anyway
+    ingest_vs_batch_size: int = int(os.getenv("INGEST_VS_BATCH_SIZE", "5000"))
+    ingest_vs_flush_seconds: float = float(os.getenv("INGEST_VS_FLUSH_SECONDS", "5"))
+    # files ingested concurrently by ingest_folder; each holds its own DB connection
+    ingest_file_concurrency: int = int(os.getenv("INGEST_FILE_CONCURRENCY", "4"))
+    embedding_target_tokens: int = int(os.getenv("EMBEDDING_TARGET_TOKENS", "16384"))
+    embedding_sample_mb: int = int(os.getenv("EMBEDDING_SAMPLE_MB", "8"))
+    # "float16" opts into fp16 model weights on GPU; changes query vectors and scores slightly
+    embedding_precision: str = os.getenv("EMBEDDING_PRECISION", "float32").lower()
+    # chunk vectors kept in memory by text hash (fp16, ~1.5KB each at 768 dims); 0 disables
+    embedding_cache_size: int = int(os.getenv("EMBEDDING_CACHE_SIZE", "50000"))
+    # Infinity/TEI-style server; empty means embed in-process
+    embedding_service_url: str = os.getenv("EMBEDDING_SERVICE_URL", "")
+    embedding_service_timeout: float = float(os.getenv("EMBEDDING_SERVICE_TIMEOUT", "60"))
+    # requests in flight to the embedding server per embed call
+    embedding_service_concurrency: int = int(os.getenv("EMBEDDING_SERVICE_CONCURRENCY", "16"))
 
     # Weather
     weather_api_key: str = str(os.getenv("WEATHER_API_KEY"))
     weather_url: str = str(os.getenv("WEATHER_URL"))
+    weather_cache_ttl: float = float(os.getenv("WEATHER_CACHE_TTL", "120"))
     # chromadb
     chroma_persist_directory: str = os.getenv("CHROMA_PERSIST_DIR", "chroma_data")
     chroma_collection_name: str = os.getenv("CHROMA_COLLECTION", "csv_rag_collection")
     chroma_telemetry_enabled: str = os.getenv("CHROMA_TELEMETRY_ENABLED", "True")
+    # HNSW graph parameters, applied when a collection is created. Defaults are
+    # Chroma's own, which existing collections were built with; l2 on
+    # normalized embeddings ranks the same as cosine.
+    hnsw_space: str = os.getenv("HNSW_SPACE", "l2")
+    hnsw_m: int = int(os.getenv("HNSW_M", "16"))
+    hnsw_ef_construction: int = int(os.getenv("HNSW_EF_CONSTRUCTION", "100"))
+    hnsw_ef_search: int = int(os.getenv("HNSW_EF_SEARCH", "10"))
 
     # Database
     database_url: str = os.getenv("DATABASE_URL", "changeme")
+    db_echo: bool = os.getenv("DB_ECHO", "False").lower() == "true"
+    db_pool_size: int = int(os.getenv("DB_POOL_SIZE", "10"))
+    db_max_overflow: int = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+    db_pool_recycle: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    # ingest commits skip the WAL flush wait; a crash loses at most the last
+    # few batches, which resume from last_row_index
+    ingest_synchronous_commit: bool = (
+        os.getenv("INGEST_SYNCHRONOUS_COMMIT", "False").lower() == "true"
+    )
 
     # Celery
     redis_url: str = os.getenv("REDIS_URL", "redis://localhost:6379/0")
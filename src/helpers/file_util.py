@@ -2,6 +2,7 @@ import os
 import hashlib
 import csv
 import asyncio
+from functools import lru_cache
 from typing import List
 
 
@@ -25,6 +26,7 @@ def scan_folder_sync(folder_path: str) -> List[str]:
     return out
 
 
+@lru_cache(maxsize=4096)
 def normalized_path(path: str) -> str:
     return os.path.normpath(path).replace("\\", "/")
 
@@ -71,6 +71,16 @@ class LazyToolWrapper(AdapterBase):
     async def initialize(self):
         await self._ensure_instance()
 
+    async def shutdown(self) -> None:
+        # nothing to release if the tool was never instantiated
+        if self._instance is None:
+            return
+        method = getattr(self._instance, "shutdown", None)
+        if callable(method):
+            result = method()
+            if inspect.isawaitable(result):
+                await result
+
     @property
     def ready(self) -> bool:
         return self._ready
@@ -1,6 +1,7 @@
 from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Set, Tuple
 from sqlalchemy import text
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
 import asyncio
 
 from src.config.logger import logging
@@ -25,11 +26,8 @@ async def advisory_lock(session: AsyncSession, key: int, wait: bool = False, ret
         attempt = 0
         while attempt <= retries:
             res = await session.execute(text(f"SELECT {func}(:k)"), {"k": key})
-            # different SQLAlchemy versions use different scalar APIs:
-            try:
-                acquired = res.scalar_one()
-            except Exception:
-                acquired = res.scalar()
+            # pg_advisory_lock returns void and only returns once the lock is held
+            acquired = wait or bool(res.scalar())
             if acquired or wait:
                 break
             attempt += 1
@@ -37,7 +35,86 @@ async def advisory_lock(session: AsyncSession, key: int, wait: bool = False, ret
         yield acquired
     finally:
         if acquired:
+            await advisory_unlock(session, key)
+
+
+async def advisory_unlock(session: AsyncSession, key: int) -> None:
+    """Release a session-level advisory lock; errors are swallowed like on context exit."""
+    try:
+        await session.execute(text("SELECT pg_advisory_unlock(:k)"), {"k": key})
+    except Exception:
+        pass
+
+
+class _SharedListener:
+    """
+    One LISTEN connection per (engine, loop, channel), shared by every waiter
+    and closed again once the last one leaves; each waiter gets its own queue
+    of payloads.
+    """
+
+    def __init__(self, engine: AsyncEngine, channel: str):
+        self.engine = engine
+        self.channel = channel
+        self._conn = None
+        self._driver = None
+        self._queues: Set[asyncio.Queue] = set()
+        self._lock = asyncio.Lock()
+
+    def _on_notify(self, _conn, _pid, _channel, payload):
+        for q in self._queues:
+            q.put_nowait(payload)
+
+    async def subscribe(self) -> asyncio.Queue:
+        async with self._lock:
+            if self._conn is None:
+                conn = await self.engine.connect()
+                try:
+                    raw = await conn.get_raw_connection()
+                    driver = raw.driver_connection
+                    await driver.add_listener(self.channel, self._on_notify)
+                except BaseException:
+                    await conn.close()
+                    raise
+                self._conn, self._driver = conn, driver
+            q: asyncio.Queue = asyncio.Queue()
+            self._queues.add(q)
+            return q
+
+    async def unsubscribe(self, q: asyncio.Queue) -> None:
+        async with self._lock:
+            self._queues.discard(q)
+            if self._queues or self._conn is None:
+                return
+            conn, driver = self._conn, self._driver
+            self._conn = self._driver = None
             try:
-                await session.execute(text("SELECT pg_advisory_unlock(:k)"), {"k": key})
-            except Exception:
-                pass
+                await driver.remove_listener(self.channel, self._on_notify)
+            finally:
+                await conn.close()
+
+
+_listeners: Dict[Tuple[int, int, str], _SharedListener] = {}
+
+
+@asynccontextmanager
+async def listen(engine: AsyncEngine, channel: str) -> AsyncIterator[asyncio.Queue]:
+    """
+    Yield a queue receiving the payload of every NOTIFY on `channel`.
+    Waiters in one process share a single connection, held outside any
+    transaction: LISTEN and delivery are both deferred inside a transaction.
+    """
+    key = (id(engine), id(asyncio.get_running_loop()), channel)
+    listener = _listeners.get(key)
+    if listener is None:
+        listener = _listeners[key] = _SharedListener(engine, channel)
+    q = await listener.subscribe()
+    try:
+        yield q
+    finally:
+        await listener.unsubscribe(q)
+
+
+async def notify(session: AsyncSession, channel: str, payload: str = ""):
+    """Queue a NOTIFY; listeners receive it when the session's transaction commits."""
+    await session.execute(text("SELECT pg_notify(:c, :p)"), {"c": channel, "p": payload})
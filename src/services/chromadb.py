@@ -1,5 +1,8 @@
 import os
-from typing import List, Dict, Any, Iterable, Optional, Sequence, Tuple
+import time
+from typing import List, Dict, Any, Iterable, Optional, Sequence, Set, Tuple, Union
+
+import numpy as np
 
 try:
     from langchain_chroma import Chroma
@@ -15,6 +18,17 @@ from src.services.embedding import get_embeddings
 
 logger = logging.getLogger(__name__)
 
+# what Chroma uses when a collection was created without hnsw:* metadata
+_CHROMA_HNSW_DEFAULTS = {
+    "hnsw:space": "l2",
+    "hnsw:M": 16,
+    "hnsw:construction_ef": 100,
+    "hnsw:search_ef": 10,
+}
+
+# seconds a shard listing is trusted before re-reading it (other workers may add shards)
+_SHARD_KEYS_TTL = 30.0
+
 
 class ChromaVectorStore:
     """
@@ -24,6 +38,9 @@ class ChromaVectorStore:
     - Query by text or by vector
     - Supports metadata filters
     - Exposes a LangChain Retriever
+    - Optional per-partition shards (one collection each) via shard()
+    - HNSW index parameters from settings (HNSW_SPACE, HNSW_M, HNSW_EF_*) for new
+      collections; an existing collection keeps its own and a mismatch is logged
     """
 
     def __init__(
@@ -37,17 +54,89 @@ class ChromaVectorStore:
         os.makedirs(persist_dir, exist_ok=True)
 
         self._emb: Embeddings = embedding_function or get_embeddings()
+        self.collection_name = collection
+        self.persist_dir = persist_dir
+        self._shards: Dict[str, "ChromaVectorStore"] = {}
+        self._shard_keys: Optional[Set[str]] = None
+        self._shard_keys_at = 0.0
 
         logger.info(
             "Initializing LangChain Chroma at %s (collection=%s)",
             persist_dir,
             collection,
         )
+        hnsw = {
+            "hnsw:space": settings.hnsw_space,
+            "hnsw:M": settings.hnsw_m,
+            "hnsw:construction_ef": settings.hnsw_ef_construction,
+            "hnsw:search_ef": settings.hnsw_ef_search,
+        }
         self.vs = Chroma(
             collection_name=collection,
             persist_directory=persist_dir,
             embedding_function=self._emb,
+            collection_metadata=hnsw,
         )
+        self._check_hnsw(hnsw)
+
+    def _check_hnsw(self, wanted: Dict[str, Any]) -> None:
+        """
+        Warn when the collection on disk was built with other HNSW parameters;
+        Chroma only applies them at creation, so settings changes are ignored.
+        """
+        actual = self.vs._collection.metadata or {}
+        diff = {}
+        for k, v in wanted.items():
+            have = actual.get(k, _CHROMA_HNSW_DEFAULTS.get(k))
+            if have != v:
+                diff[k] = (have, v)
+        if diff:
+            logger.warning(
+                "Collection %s keeps its creation-time HNSW parameters; "
+                "settings differ (existing, configured): %s. "
+                "Re-create the collection to apply them.",
+                self.collection_name,
+                diff,
+            )
+
+    def shard(self, key: str) -> "ChromaVectorStore":
+        """
+        Store for one partition (e.g. one CSV file) in its own collection
+        "<collection>__<key>". HNSW insert cost grows with collection size,
+        so many small collections keep add throughput flat.
+        """
+        vs = self._shards.get(key)
+        if vs is None:
+            vs = ChromaVectorStore(
+                collection_name=f"{self.collection_name}__{key}",
+                embedding_function=self._emb,
+                persist_directory=self.persist_dir,
+            )
+            self._shards[key] = vs
+            if self._shard_keys is not None:
+                self._shard_keys.add(key)
+        return vs
+
+    def shard_keys(self, refresh: bool = False) -> Set[str]:
+        """
+        Keys of every shard collection that exists on disk.
+        The listing is cached for _SHARD_KEYS_TTL seconds and kept current by
+        shard(); pass refresh=True to re-read it now.
+        """
+        now = time.monotonic()
+        if (
+            refresh
+            or self._shard_keys is None
+            or now - self._shard_keys_at > _SHARD_KEYS_TTL
+        ):
+            prefix = f"{self.collection_name}__"
+            names = [
+                c if isinstance(c, str) else c.name
+                for c in self.vs._client.list_collections()
+            ]
+            self._shard_keys = {n[len(prefix):] for n in names if n.startswith(prefix)}
+            self._shard_keys_at = now
+        return self._shard_keys
 
     def add_texts(
         self,
@@ -72,17 +161,84 @@ class ChromaVectorStore:
 
     def add_embeddings(
         self,
-        embeddings: Sequence[Sequence[float]],
+        embeddings: Union[np.ndarray, Sequence[Sequence[float]]],
         metadatas: Optional[Sequence[Dict[str, Any]]] = None,
         ids: Optional[Sequence[str]] = None,
+        documents: Optional[Sequence[str]] = None,
+    ) -> List[str]:
+        """
+        Upsert precomputed vectors with metadata, ids and source texts
+        (useful if you embed elsewhere). Goes straight to the Chroma
+        collection so LangChain does not embed the texts a second time.
+        """
+        if ids is None:
+            raise ValueError("add_embeddings requires explicit ids")
+        return self.add_batch(ids, embeddings, metadatas, documents)
+
+    def add_batch(
+        self,
+        ids: Sequence[str],
+        embeddings: Union[np.ndarray, Sequence[Sequence[float]]],
+        metadatas: Optional[Sequence[Dict[str, Any]]] = None,
+        documents: Optional[Sequence[str]] = None,
+        batch_size: Optional[int] = None,
     ) -> List[str]:
         """
-        Add precomputed vectors with metadata and ids (useful if you embed elsewhere).
+        Upsert vectors with one collection.upsert per slice of batch_size
+        (capped at the client's max batch size).
+        Vectors are handed over as one contiguous float32 (N, D) array;
+        ndarray input from embed_texts is passed through without a copy.
         """
-        return self.vs.add_embeddings(
-            embeddings=list(embeddings), metadatas=metadatas, ids=ids
+        ids = list(ids)
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+        metadatas = list(metadatas) if metadatas is not None else None
+        documents = list(documents) if documents is not None else None
+
+        step = self._slice_size(batch_size, len(ids))
+        for i in range(0, len(ids), step):
+            self.vs._collection.upsert(
+                ids=ids[i : i + step],
+                embeddings=embeddings[i : i + step],
+                metadatas=metadatas[i : i + step] if metadatas is not None else None,
+                documents=documents[i : i + step] if documents is not None else None,
+            )
+        return ids
+
+    def delete_batch(self, ids: Sequence[str], batch_size: Optional[int] = None) -> None:
+        """
+        Delete by ids with one collection.delete per slice of batch_size
+        (capped at the client's max batch size).
+        """
+        ids = list(ids)
+        step = self._slice_size(batch_size, len(ids))
+        for i in range(0, len(ids), step):
+            self.vs._collection.delete(ids=ids[i : i + step])
+
+    def get_page(self, limit: int) -> Dict[str, Any]:
+        """Up to `limit` vectors with their ids, embeddings, metadata and documents."""
+        return self.vs._collection.get(
+            limit=limit, include=["embeddings", "metadatas", "documents"]
         )
 
+    def ids_where(self, where: Dict[str, Any]) -> List[str]:
+        """Ids of every vector whose metadata matches `where` (no payload fetched)."""
+        return self.vs._collection.get(where=where, include=[])["ids"]
+
+    def _slice_size(self, batch_size: Optional[int], n: int) -> int:
+        limit = self._max_batch_size()
+        step = batch_size or limit or n
+        if limit:
+            step = min(step, limit)
+        return max(step, 1)
+
+    def _max_batch_size(self) -> Optional[int]:
+        """Largest upsert the Chroma client accepts (SQLite's variable limit), if it says."""
+        get_max = getattr(self.vs._client, "get_max_batch_size", None)
+        try:
+            return int(get_max()) if callable(get_max) else None
+        except Exception:
+            return None
+
     def persist(self) -> None:
         """Flush in-memory state to disk."""
         self.vs.persist()
@@ -131,7 +287,7 @@ class ChromaVectorStore:
         """
         Vector search that also returns (Document, score) pairs.
         """
-        return self.vs.similarity_search_with_score(
+        return self.vs.similarity_search_by_vector_with_relevance_scores(
             embedding=list(query_vector), k=k, filter=filter
         )
 
@@ -1,7 +1,13 @@
 from functools import lru_cache
-import hashlib
+import asyncio
+import importlib.util
+import threading
 
-from typing import Dict, Any
+from typing import Dict, Any, FrozenSet, Iterable, List, Optional
+
+import httpx
+import numpy as np
+import xxhash
 
 try:
     from langchain_huggingface import HuggingFaceEmbeddings
@@ -9,28 +15,312 @@ except Exception:
     from langchain_community.embeddings import HuggingFaceEmbeddings  # type: ignore
 
 from langchain.embeddings.base import Embeddings
+from src.config.logger import logging
 from src.config.settings import settings
 
+logger = logging.getLogger(__name__)
+
+MIN_EMBED_BATCH = 32
+MAX_EMBED_BATCH = 1024
+# rough chars-per-token ratio; only used to size batches, never to truncate
+CHARS_PER_TOKEN = 4
+
+
+@lru_cache(maxsize=1)
+def cuda_available() -> bool:
+    try:
+        import torch
+    except ImportError:
+        return False
+    return torch.cuda.is_available()
+
 
 @lru_cache(maxsize=1)
+def auto_batch_size() -> int:
+    """
+    Pick an encode batch size from free GPU memory (computed once).
+    Falls back to settings.embedding_batch_size on CPU-only hosts.
+    """
+    if not cuda_available():
+        return settings.embedding_batch_size
+
+    import torch
+
+    free_bytes, _ = torch.cuda.mem_get_info()
+    free_mb = free_bytes // (1024 * 1024)
+    bs = min(
+        MAX_EMBED_BATCH,
+        max(MIN_EMBED_BATCH, free_mb // max(1, settings.embedding_sample_mb)),
+    )
+    logger.info("Embedding batch size tuned to %s (free VRAM=%sMB)", bs, free_mb)
+    return bs
+
+
+def _model_kwargs() -> Dict[str, Any]:
+    """
+    Opt-in (EMBEDDING_PRECISION=float16): fp16 weights halve memory traffic
+    during encode; only worth it on GPU. Vectors handed to the store stay
+    float32 (Chroma has no fp16/int8 index), but their values shift slightly,
+    so switching mid-corpus mixes fp16 and fp32 embeddings.
+    """
+    if settings.embedding_precision == "float16" and cuda_available():
+        return {"device": "cuda", "model_kwargs": {"torch_dtype": "float16"}}
+    return {}
+
+
+_embeddings: Optional[Embeddings] = None
+_embeddings_lock = threading.Lock()
+
+
 def get_embeddings() -> Embeddings:
     """
     Return a LangChain-compatible embedding model (HuggingFace).
     Normalization is enabled so scores behave like cosine similarity.
+    Loaded once under a lock: ingest and query threads may race on first use
+    and the weights are too large to load twice.
     """
-    return HuggingFaceEmbeddings(
-        model_name=settings.embedding_model,
-        encode_kwargs={"normalize_embeddings": True},
-        # model_kwargs={"device": "cuda"},  # uncomment if you run on GPU
-    )
+    global _embeddings
+    if _embeddings is not None:
+        return _embeddings
+
+    with _embeddings_lock:
+        if _embeddings is None:
+            _embeddings = HuggingFaceEmbeddings(
+                model_name=settings.embedding_model,
+                model_kwargs=_model_kwargs(),
+                encode_kwargs={
+                    "normalize_embeddings": True,
+                    "batch_size": auto_batch_size(),
+                },
+            )
+    return _embeddings
 
 
-def prepare_text_for_embedding(row: Dict[str, Any]) -> str:
+@lru_cache(maxsize=1)
+def get_tokenizer():
     """
-    Convert a CSV row into a structured text string for embedding.
-    Filters out noise fields like IDs, phone numbers, URLs.
+    Fast (Rust) tokenizer of the embedding model, or None when it cannot be
+    loaded (e.g. offline without a cached tokenizer.json).
+    """
+    try:
+        from tokenizers import Tokenizer
+
+        tok = Tokenizer.from_pretrained(settings.embedding_model)
+    except Exception as e:
+        logger.warning("Tokenizer for %s unavailable: %s", settings.embedding_model, e)
+        return None
+    tok.no_truncation()
+    tok.no_padding()
+    return tok
+
+
+def split_by_tokens(
+    texts: List[str], max_tokens: int, overlap: int, tokenizer
+) -> List[List[str]]:
+    """
+    Split each text into windows of at most max_tokens tokens, consecutive
+    windows sharing `overlap` tokens. One encode_batch call tokenizes all
+    texts in parallel; windows are cut from the original text by char offsets.
+    """
+    step = max(1, max_tokens - overlap)
+    out: List[List[str]] = []
+    for text, enc in zip(texts, tokenizer.encode_batch(texts, add_special_tokens=False)):
+        offsets = enc.offsets
+        pieces: List[str] = []
+        for start in range(0, len(offsets), step):
+            end = min(start + max_tokens, len(offsets))
+            pieces.append(text[offsets[start][0] : offsets[end - 1][1]])
+            if end == len(offsets):
+                break
+        out.append(pieces)
+    return out
+
+
+def pack_by_tokens(
+    texts: List[str], target_tokens: int, max_batch: int
+) -> List[List[int]]:
+    """
+    Smart batching: sort indices by length and greedily bin them so each
+    batch holds ~target_tokens (and at most max_batch texts).
+    Similar lengths per batch keep padding waste low.
+    """
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+    batches: List[List[int]] = []
+    current: List[int] = []
+    current_tokens = 0
+
+    for i in order:
+        n_tokens = len(texts[i]) // CHARS_PER_TOKEN + 1
+        if current and (
+            current_tokens + n_tokens > target_tokens or len(current) >= max_batch
+        ):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(i)
+        current_tokens += n_tokens
+
+    if current:
+        batches.append(current)
+    return batches
+
+
+def embed_texts(
+    texts: List[str],
+    batch_size: Optional[int] = None,
+    target_tokens: Optional[int] = None,
+) -> np.ndarray:
+    """
+    Embed texts in token-packed batches into one pre-allocated float32
+    matrix of shape (len(texts), dim). Row order matches input order.
+    """
+    if not texts:
+        return np.empty((0, 0), dtype=np.float32)
+
+    model = get_embeddings()
+    bs = batch_size or auto_batch_size()
+    budget = target_tokens or settings.embedding_target_tokens
+
+    out: Optional[np.ndarray] = None
+    for idx in pack_by_tokens(texts, budget, bs):
+        embs = np.asarray(
+            model.embed_documents([texts[i] for i in idx]), dtype=np.float32
+        )
+        if out is None:
+            out = np.empty((len(texts), embs.shape[1]), dtype=np.float32)
+        out[idx] = embs
+    return out
+
+
+class InfinityEmbedder:
+    """
+    Client for an Infinity/TEI-style embedding server (OpenAI-compatible
+    POST /embeddings). Texts are length-sorted into token-packed batches so the
+    server pads little, and up to max_concurrency batches are in flight at once;
+    vectors are L2-normalized like the local model.
+    """
+
+    def __init__(
+        self, base_url: str, model: str, timeout: float = 60.0, max_concurrency: int = 16
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self._client: Optional[httpx.AsyncClient] = None
+        self._client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        # connection pools are bound to an event loop; celery tasks run a fresh loop each
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client_loop is not loop:
+            self._retire_client()
+            # keep one warm connection per concurrent batch; HTTP/2 multiplexes them when h2 is installed
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                http2=importlib.util.find_spec("h2") is not None,
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency,
+                    max_keepalive_connections=self.max_concurrency,
+                ),
+            )
+            self._client_loop = loop
+        return self._client
+
+    def _retire_client(self) -> None:
+        """Release a client left behind by another event loop."""
+        client, loop = self._client, self._client_loop
+        self._client = self._client_loop = None
+        if client is None or client.is_closed:
+            return
+        if loop is not None and not loop.is_closed():
+            # its connections belong to that loop, so close them there
+            asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+        # else: the loop is gone with its transports; dropping the client frees the pool
+
+    async def shutdown(self) -> None:
+        if self._client is not None and not self._client.is_closed:
+            if self._client_loop is asyncio.get_running_loop():
+                await self._client.aclose()
+            else:
+                self._retire_client()
+        self._client = self._client_loop = None
+
+    async def _post(self, texts: List[str]) -> np.ndarray:
+        resp = await self._get_client().post(
+            "/embeddings", json={"model": self.model, "input": texts}
+        )
+        resp.raise_for_status()
+        data = sorted(resp.json()["data"], key=lambda d: d["index"])
+        return np.asarray([d["embedding"] for d in data], dtype=np.float32)
+
+    async def embed_texts_async(
+        self,
+        texts: List[str],
+        batch_size: Optional[int] = None,
+        target_tokens: Optional[int] = None,
+    ) -> np.ndarray:
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+
+        bs = batch_size or settings.embedding_batch_size
+        budget = target_tokens or settings.embedding_target_tokens
+        batches = pack_by_tokens(texts, budget, bs)
+        sem = asyncio.Semaphore(self.max_concurrency)
+
+        async def _embed(idx: List[int]) -> np.ndarray:
+            async with sem:
+                return await self._post([texts[i] for i in idx])
+
+        parts = await asyncio.gather(*(_embed(idx) for idx in batches))
+        # batches are in length order; scatter rows back to input order
+        out = np.empty((len(texts), parts[0].shape[1]), dtype=np.float32)
+        for idx, embs in zip(batches, parts):
+            out[idx] = embs
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        np.divide(out, norms, out=out, where=norms > 0)
+        return out
+
+
+_remote_embedder: Optional[InfinityEmbedder] = None
+
+
+def get_remote_embedder() -> Optional[InfinityEmbedder]:
+    """Embedding-server client when EMBEDDING_SERVICE_URL is set, else None."""
+    global _remote_embedder
+    if _remote_embedder is None and settings.embedding_service_url:
+        _remote_embedder = InfinityEmbedder(
+            settings.embedding_service_url,
+            settings.embedding_model,
+            timeout=settings.embedding_service_timeout,
+            max_concurrency=settings.embedding_service_concurrency,
+        )
+    return _remote_embedder
+
+
+async def shutdown_remote_embedder() -> None:
+    """Close the embedding-server client's connections, if one was created."""
+    if _remote_embedder is not None:
+        await _remote_embedder.shutdown()
+
+
+async def embed_texts_async(
+    texts: List[str],
+    batch_size: Optional[int] = None,
+    target_tokens: Optional[int] = None,
+) -> np.ndarray:
+    """
+    Async entry point used by ingestion: goes to the embedding server when one
+    is configured, otherwise runs the local encode off the event loop.
     """
-    ignore_keys = {
+    remote = get_remote_embedder()
+    if remote is not None:
+        return await remote.embed_texts_async(texts, batch_size, target_tokens)
+    return await asyncio.to_thread(embed_texts, texts, batch_size, target_tokens)
+
+
+IGNORE_KEYS = frozenset(
+    {
         "id",
         "external_id",
         "phone",
@@ -40,12 +330,33 @@ def prepare_text_for_embedding(row: Dict[str, Any]) -> str:
         "link",
         "number",
     }
+)
+
+
+def ignored_keys_for(keys: Iterable[str]) -> FrozenSet[str]:
+    """
+    Resolve which of a file's column names are noise fields.
+    Compute once per file (all rows share the header) and pass the result
+    to prepare_text_for_embedding.
+    """
+    return frozenset(k for k in keys if k.lower() in IGNORE_KEYS)
+
+
+def prepare_text_for_embedding(
+    row: Dict[str, Any], ignored: Optional[FrozenSet[str]] = None
+) -> str:
+    """
+    Convert a CSV row into a structured text string for embedding.
+    Filters out noise fields like IDs, phone numbers, URLs.
+    """
+    if ignored is None:
+        ignored = ignored_keys_for(row.keys())
     parts = []
 
     for k, v in row.items():
         if not v:
             continue
-        if k.lower() in ignore_keys:
+        if k in ignored:
             continue
         if isinstance(v, (int, float)):
             continue
@@ -55,63 +366,29 @@ def prepare_text_for_embedding(row: Dict[str, Any]) -> str:
 
 
 def row_checksum(values: Dict[str, str]) -> str:
-    """Compute a stable checksum for row dict. Use sorted keys to be deterministic."""
-    m = hashlib.sha256()
-    for k in sorted(values.keys()):
-        v = values[k]
-        if v is None:
-            v = ""
-
-        if isinstance(v, str):
-            b = v.encode("utf-8")
-        else:
-            b = str(v).encode("utf-8")
-        m.update(k.encode("utf-8") + b"=" + b + b";")
-    return m.hexdigest()
-
-
-# import numpy as np
-# from typing import List, Union, Dict, Any
-# import asyncio
-# from sentence_transformers import SentenceTransformer
-# from numpy.linalg import norm
-
-# from src.config.settings import settings
-
-# _model = None
-
-
-# def get_model():
-#     """Lazy load embedding model"""
-#     global _model
-#     if _model is None:
-#         _model = SentenceTransformer(settings.embedding_model)
-#     return _model
-
-
-# def embed_texts(
-#     texts: List[str], batch_size: int | None = None, as_numpy: bool = True
-# ) -> Union[np.ndarray, List[List[float]]]:
-#     """Embed texts using the model with optional normalization."""
-
-#     if not texts:
-#         return []
-
-#     model = get_model()
-#     bs = batch_size or settings.embedding_batch_size
-
-#     all_embs = []
-#     for i in range(0, len(texts), bs):
-#         batch = texts[i : i + bs]
-#         embs = model.encode(batch, show_progress_bar=False, convert_to_numpy=True)
-#         # Normalize for cosine similarity
-#         embs = embs / norm(embs, axis=1, keepdims=True)
-#         all_embs.append(embs)
-
-#     embs = np.vstack(all_embs)
-#     return embs if as_numpy else embs.tolist()
+    """
+    Compute a stable checksum for row dict. Use sorted keys to be deterministic.
+    Dedup/change detection only, not cryptographic: 128-bit xxh3 over the
+    "k=v;" payload is an order of magnitude cheaper than SHA-256.
+    Rows checksummed before the switch (SHA-256) never match, so they are
+    re-embedded once on the next ingest of their file.
+    """
+    payload = "".join(
+        f"{k}={'' if values[k] is None else values[k]};" for k in sorted(values)
+    )
+    return xxhash.xxh3_128_hexdigest(payload.encode("utf-8"))
 
 
-# async def embed_texts_async(texts, batch_size=None):
-#     """Async wrapper"""
-#     return await asyncio.to_thread(embed_texts, texts, batch_size)
+def frame_checksums(df, file_id: int) -> List[str]:
+    """
+    row_checksum for every row of a DataFrame chunk (str cells, no NaN), with
+    file_id folded in the same way RowStreamer does. The "k=v;" payload is
+    built column-wise, so only the hash itself runs per row.
+    """
+    if df.empty:
+        return []
+    work = df.assign(file_id=str(file_id))
+    parts = [f"{c}=" + work[c] + ";" for c in sorted(work.columns)]
+    payload = parts[0].str.cat(parts[1:]) if len(parts) > 1 else parts[0]
+    digest = xxhash.xxh3_128_hexdigest
+    return [digest(p.encode("utf-8")) for p in payload]
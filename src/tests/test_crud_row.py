@@ -0,0 +1,47 @@
+from src.app.tool.tools.rag.crud.crud_row import (
+    _UPSERT_FROM_STAGE,
+    _copy_records,
+    _last_per_external_id,
+)
+from src.app.tool.tools.rag.schemas import RowBatch
+from src.enum.csv_status import EmbeddingStatus
+
+
+def _batch(*rows):
+    batch = RowBatch(file_id=5)
+    for external_id, content in rows:
+        batch.append(external_id, content, f"chk-{content}", {"external_id": external_id})
+    return batch
+
+
+def test_last_per_external_id_keeps_last_occurrence_in_order():
+    batch = _batch((1, "a"), (2, "b"), (1, "c"), (3, "d"), (2, "e"))
+
+    deduped = _last_per_external_id(batch)
+
+    assert deduped.external_ids == [1, 3, 2]
+    assert deduped.contents == ["c", "d", "e"]
+
+
+def test_last_per_external_id_returns_unique_batch_as_is():
+    batch = _batch((1, "a"), (2, "b"))
+
+    assert _last_per_external_id(batch) is batch
+
+
+def test_copy_records_follow_stage_columns():
+    batch = _batch((7, "x"))
+
+    assert _copy_records(batch) == [(5, 7, "x", "chk-x", '{"external_id":7}')]
+    assert _copy_records(batch, with_status=True)[0][-1] == EmbeddingStatus.PENDING.value
+
+
+def test_upsert_resets_changed_rows_to_pending():
+    sql = str(_UPSERT_FROM_STAGE)
+    update = sql.split("DO UPDATE SET", 1)[1]
+
+    assert f"embedding_status = '{EmbeddingStatus.PENDING.value}'" in update
+    assert "embedding_error = NULL" in update
+    assert "xmax <> 0 AS updated" in sql
+    # the replaced checksum comes back so the ingest cache can evict it
+    assert sql.rstrip().endswith("LEFT JOIN prev ON prev.id = up.id")
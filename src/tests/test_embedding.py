@@ -0,0 +1,53 @@
+import re
+
+import pandas as pd
+import xxhash
+
+from src.services.embedding import frame_checksums, pack_by_tokens, row_checksum, split_by_tokens
+
+
+def test_pack_by_tokens_covers_every_index_once():
+    texts = ["a" * n for n in (400, 4, 40, 4000, 12, 400)]
+    batches = pack_by_tokens(texts, target_tokens=200, max_batch=3)
+
+    flat = [i for b in batches for i in b]
+    assert sorted(flat) == list(range(len(texts)))
+    assert all(len(b) <= 3 for b in batches)
+
+
+def test_pack_by_tokens_groups_similar_lengths():
+    texts = ["x" * 1000, "y", "z" * 1000, "w"]
+    batches = pack_by_tokens(texts, target_tokens=10_000, max_batch=2)
+
+    assert batches == [[1, 3], [0, 2]]
+
+
+def test_row_checksum_matches_key_value_format():
+    row = {"name": "Café", "file_id": 3, "note": None}
+    expected = xxhash.xxh3_128_hexdigest("file_id=3;name=Café;note=;".encode("utf-8"))
+
+    assert row_checksum(row) == expected
+    assert row_checksum(dict(reversed(list(row.items())))) == expected
+
+
+def test_frame_checksums_match_row_checksum():
+    df = pd.DataFrame({"name": ["Café", "Tea"], "external_id": ["1", "2"], "note": ["", "x"]})
+
+    expected = [row_checksum({**rec, "file_id": 7}) for rec in df.to_dict("records")]
+    assert frame_checksums(df, 7) == expected
+
+
+class _WordTokenizer:
+    class _Encoding:
+        def __init__(self, text):
+            self.offsets = [m.span() for m in re.finditer(r"\S+", text)]
+
+    def encode_batch(self, texts, add_special_tokens=True):
+        return [self._Encoding(t) for t in texts]
+
+
+def test_split_by_tokens_windows_overlap_and_keep_original_text():
+    text = "a bb  c dd e"
+    [pieces] = split_by_tokens([text], max_tokens=3, overlap=1, tokenizer=_WordTokenizer())
+
+    assert pieces == ["a bb  c", "c dd e"]
@@ -0,0 +1,62 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from src.app.tool.tools.rag.managers.ingest_manager import CSVIngestManager, VectorStoreAdapter
+
+
+class _FakeCollection:
+    def __init__(self, rows=None):
+        # id -> (embedding, metadata, document)
+        self.rows = dict(rows or {})
+        self.shards = {}
+
+    def get_page(self, limit):
+        ids = list(self.rows)[:limit]
+        return {
+            "ids": ids,
+            "embeddings": [self.rows[i][0] for i in ids],
+            "metadatas": [self.rows[i][1] for i in ids],
+            "documents": [self.rows[i][2] for i in ids],
+        }
+
+    def add_batch(self, ids, embeddings, metadatas, documents):
+        for i, emb, meta, doc in zip(ids, embeddings, metadatas, documents):
+            self.rows[i] = (list(emb), meta, doc)
+
+    def delete_batch(self, ids):
+        for i in ids:
+            del self.rows[i]
+
+    def shard(self, key):
+        return self.shards.setdefault(key, _FakeCollection())
+
+
+class _FakeRepo:
+    def __init__(self, owners):
+        self.owners = owners
+
+    async def file_ids_for_rows(self, session, row_ids):
+        return {r: self.owners[r] for r in row_ids if r in self.owners}
+
+
+def test_shard_legacy_vectors_moves_rows_to_their_file_shard():
+    legacy = _FakeCollection(
+        {
+            f"CSVRow:{row_id}:0": ([float(row_id)], {"row_id": row_id, "chunk_index": 0}, f"doc{row_id}")
+            for row_id in (1, 2, 3)
+        }
+    )
+    mgr = CSVIngestManager.__new__(CSVIngestManager)
+    mgr.vs = legacy
+    mgr.repo = _FakeRepo({1: 10, 2: 20})  # row 3 was deleted from csv_rows
+    mgr.vs_adapter = VectorStoreAdapter(legacy, executor=ThreadPoolExecutor(max_workers=1))
+
+    moved = asyncio.run(mgr.shard_legacy_vectors(session=None, page_size=2))
+
+    assert moved == 2
+    assert legacy.rows == {}
+    assert legacy.shards["file_10"].rows == {"CSVRow:1:0": ([1.0], {"row_id": 1, "chunk_index": 0}, "doc1")}
+    assert list(legacy.shards["file_20"].rows) == ["CSVRow:2:0"]
+    assert np.allclose(legacy.shards["file_20"].rows["CSVRow:2:0"][0], [2.0])
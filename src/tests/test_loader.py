@@ -0,0 +1,22 @@
+import asyncio
+
+from src.app.tool.tools.rag.loader import CSVLoader
+
+
+def _rows(path, skip_rows):
+    async def collect():
+        out = []
+        async for df in CSVLoader.stream_frames_async(str(path), chunksize=2, skip_rows=skip_rows):
+            out.extend(df.to_dict("records"))
+        return out
+
+    return asyncio.run(collect())
+
+
+def test_stream_frames_skip_rows_resumes_after_ingested_rows(tmp_path):
+    path = tmp_path / "rows.csv"
+    path.write_text('id,note\n1,"two\nlines"\n2,\n3,c\n4,d\n', encoding="utf-8-sig")
+
+    assert _rows(path, 0)[:2] == [{"id": "1", "note": "two\nlines"}, {"id": "2", "note": ""}]
+    assert _rows(path, 2) == [{"id": "3", "note": "c"}, {"id": "4", "note": "d"}]
+    assert _rows(path, 4) == []
@@ -0,0 +1,48 @@
+import asyncio
+
+from src.app.tool.tools.rag.managers.query_manager import CSVQueryManager
+
+
+class _FakeStore:
+    def __init__(self, hits, shards=None):
+        self.hits = hits
+        self.shards = shards or {}
+        self.filters = []
+
+    def similarity_search_by_vector_with_score(self, query_vector, k, filter=None):
+        self.filters.append(filter)
+        return self.hits[:k]
+
+    def shard_keys(self, refresh=False):
+        return set(self.shards)
+
+    def shard(self, key):
+        return self.shards[key]
+
+
+def _manager(vs):
+    # skip __init__: no retriever or database needed for store selection and merging
+    qm = CSVQueryManager.__new__(CSVQueryManager)
+    qm.vs = vs
+    return qm
+
+
+def test_vector_search_merges_stores_by_distance():
+    a = _FakeStore([("a1", 0.1), ("a2", 0.7)])
+    b = _FakeStore([("b1", 0.3), ("b2", 0.4)])
+    qm = _manager(a)
+
+    results = asyncio.run(qm._vector_search([(a, None), (b, {"x": 1})], [0.0], top_k=3))
+
+    assert results == [("a1", 0.1), ("b1", 0.3), ("b2", 0.4)]
+    assert b.filters == [{"x": 1}]
+
+
+def test_stores_picks_file_shard_or_nothing():
+    shard = _FakeStore([])
+    legacy = _FakeStore([], shards={"file_1": shard})
+    qm = _manager(legacy)
+
+    assert qm._stores(1, {"x": 1}) == [(shard, {"x": 1})]
+    assert qm._stores(2, None) == []
+    assert qm._stores(None, None) == [(legacy, None), (shard, None)]
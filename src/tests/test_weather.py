@@ -0,0 +1,47 @@
+import asyncio
+
+from src.app.tool.tools.weather import weather as weather_mod
+from src.app.tool.tools.weather.weather import WeatherTool
+
+
+def _tool(monkeypatch, now):
+    tool = WeatherTool(cities_path=None)
+    tool._cache_ttl = 60
+    tool._infos = [{"name": "Tehran"}]
+    tool._index_by_lower = {"tehran": 0}
+    monkeypatch.setattr(weather_mod.time, "monotonic", lambda: now[0])
+    return tool
+
+
+def test_cached_entry_expires_after_ttl(monkeypatch):
+    now = [100.0]
+    tool = _tool(monkeypatch, now)
+    tool._cache["tehran"] = (100.0, {"temp": 20})
+
+    now[0] = 159.9
+    assert tool._cached("tehran") == {"temp": 20}
+    now[0] = 160.0
+    assert tool._cached("tehran") is None
+    assert "tehran" not in tool._cache
+
+
+def test_run_fetches_once_per_ttl_window(monkeypatch):
+    now = [0.0]
+    tool = _tool(monkeypatch, now)
+    calls = []
+
+    async def fake_fetch(city_info):
+        calls.append(city_info["name"])
+        return {"temp": len(calls)}
+
+    monkeypatch.setattr(tool, "_fetch", fake_fetch)
+
+    async def ask():
+        return await tool.run({"city": "Tehran"})
+
+    first = asyncio.run(ask())
+    first["temp"] = -1
+    assert asyncio.run(ask()) == {"temp": 1}
+    now[0] = 61.0
+    assert asyncio.run(ask()) == {"temp": 2}
+    assert calls == ["Tehran", "Tehran"]